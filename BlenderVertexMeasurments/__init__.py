@@ -0,0 +1,2231 @@
+bl_info = {
+    "name": "Selected Vert-to-Vert Distances (GPU Screen-Space Text)",
+    "author": "ChatGPT - CAD Sketcher Inspired Text Display",
+    "version": (17, 0),
+    "blender": (4, 4, 0),
+    "location": "View3D > Sidebar (N) > Blender Vertex Measurments",
+    "description": "Realtime distances with GPU lines + CAD Sketcher inspired screen-space text",
+    "category": "3D View",
+}
+
+import bpy
+from mathutils import Vector, Matrix
+from mathutils.bvhtree import BVHTree
+import gpu
+from gpu_extras.batch import batch_for_shader
+import bmesh
+import concurrent.futures
+import csv
+import functools
+import io
+import itertools
+import json
+import numpy as np
+import os
+import time
+import traceback
+import zlib
+import blf
+from bpy_extras import view3d_utils
+from bpy_extras.io_utils import ExportHelper
+import bpy.utils.units
+
+from . import core
+
+_gpu_pairs = []          # list[(va, vb, dist)]
+_pairs_version = 0       # bumped whenever _gpu_pairs actually changes
+_draw_handler = None
+_line_draw_handler = None
+_line_batch = None       # (pairs version, GPUBatch) of the cached line batch
+_label_cache = None      # (pairs version, midpoints, texts) for the BLF labels
+_declutter_culled = 0    # labels hidden by the last declutter pass, shown in the panel
+_spacing_stats = None    # latest VIEW3D_OT_analyze_world_distances result, shown in the panel
+_handler_registered = False
+_last_vertex_positions = {}  # Cache for vertex positions to detect changes
+_last_timer_signature = None  # Measurement signature the positions above were taken under
+_update_timer = None  # Timer for frequent updates
+_timer_interval = 0.1
+
+_TIMER_MIN_INTERVAL = 0.05  # while things are moving
+_TIMER_MAX_INTERVAL = 1.0   # fully backed off on an idle scene
+_TIMER_BACKOFF = 1.5
+_adjacency_cache = {}  # object name -> (topology signature, indptr, indices), see _mesh_adjacency
+_locked_sets_cache = None  # (cache key, decoded index arrays), see _compile_locked_sets
+_pending_updates = {}  # object name -> 'TRANSFORM' or 'GEOMETRY', merged until the next flush
+_pending_full = False  # selection / settings changed, everything must be recomputed
+_flush_scheduled = False
+_measure_signature = None
+_geometry_versions = {}  # object name -> bumped on every geometry change seen by the depsgraph handler
+_pair_cache = None  # local-space copy of the last searched pairs, see _cache_pairs
+_evaluated_cache = {}  # object name -> (geometry version, post-modifier local coords), see _evaluated_local_coords
+_bvh_cache = {}  # object name -> (cache key, BMesh, local-space BVHTree, local coords, ...), see _object_bvh
+_overlap_cache = {}  # (object name, object name) -> (cache key, local intersection point or None), see _overlap_point
+_sample_cache = {}  # object name -> (cache key, sampled positions), see _sample_indices
+_edit_coords_cache = {}  # object name -> (cache key, Edit Mode local coords), see _edit_mode_coords
+_bg_executor = None  # single worker thread for background_compute
+_bg_future = None    # (serial, signature, Future) of the search in flight
+_bg_next = None      # (serial, signature, snapshot) waiting for the worker
+_bg_serial = 0       # serial of the newest snapshot; older results are stale
+_profiling = False   # per-stage timing on / off, mirrors DistanceSettings.profiling
+_profile_stats = {}  # stage name -> _StageStats
+_PROFILE_WINDOW = 256  # recent calls per stage kept for the percentiles
+_tagged_version = -1     # _pairs_version the viewports were last tagged for
+_last_tag_time = 0.0     # perf_counter of that tag
+_redraw_deferred = False  # a rate-limited tag is waiting in _deferred_view3d_redraw
+_REDRAW_INTERVAL = 1.0 / 60.0  # bpy exposes no display refresh rate; assume 60 Hz
+
+_TEXT_COLLECTION_NAME = "WorldDistancesText"
+_LOCK_PROP = "wd_locked_verts"  # per-object ID property holding the locked indices, see _encode_indices
+_LINES_OBJECT_NAME = "WD_Lines"
+_ALL_VERTICES = 2 ** 31 - 1  # vertex budget that never samples, for exports and analysis
+FONT_ID = 0
+
+
+# ========= profiling =========
+
+class _StageStats:
+    """Durations of one stage: a ring buffer of the last _PROFILE_WINDOW calls plus running totals."""
+
+    __slots__ = ("samples", "pos", "count", "max_ns")
+
+    def __init__(self):
+        self.samples = np.zeros(_PROFILE_WINDOW, dtype=np.int64)
+        self.pos = 0
+        self.count = 0
+        self.max_ns = 0
+
+    def add(self, ns):
+        self.samples[self.pos] = ns
+        self.pos = (self.pos + 1) % _PROFILE_WINDOW
+        self.count += 1
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def summary(self):
+        window = self.samples[:min(self.count, _PROFILE_WINDOW)]
+        p50, p95 = np.percentile(window, (50, 95)) / 1e6
+        return {"count": self.count, "p50_ms": float(p50), "p95_ms": float(p95), "max_ms": self.max_ns / 1e6}
+
+
+def _profile_add(stage, ns):
+    """Add a duration of ns nanoseconds to stage. Main thread only: the panel reads _profile_stats."""
+    stats = _profile_stats.get(stage)
+    if stats is None:
+        stats = _profile_stats[stage] = _StageStats()
+    stats.add(ns)
+
+
+def _profile_record(stage, start_ns):
+    """Add the time since start_ns (a perf_counter_ns value) to stage."""
+    _profile_add(stage, time.perf_counter_ns() - start_ns)
+
+
+def _profiled(stage):
+    """Decorator timing every call as stage while profiling is on; one flag check otherwise."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _profiling:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _profile_record(stage, start)
+        return wrapper
+    return decorate
+
+
+def _profile_report():
+    """JSON-ready {stage: summary} of everything recorded since profiling was switched on."""
+    return {
+        "window": _PROFILE_WINDOW,
+        "stages": {stage: stats.summary() for stage, stats in sorted(_profile_stats.items())},
+    }
+
+
+def _profiling_update(self, context):
+    global _profiling
+
+    _profiling = self.profiling
+    if _profiling:
+        _profile_stats.clear()
+
+
+# ========= CAD Sketcher inspired value_placement =========
+
+def value_placement(context, world_pos):
+    """Calculate screen position for text display (inspired by CAD Sketcher)"""
+    region = context.region
+    rv3d = context.space_data.region_3d
+
+    # Convert 3D world position to 2D screen coordinates
+    screen_pos = view3d_utils.location_3d_to_region_2d(region, rv3d, world_pos)
+    return screen_pos
+
+
+# ========= text collection helpers =========
+
+def _get_text_collection(create=False):
+    col = bpy.data.collections.get(_TEXT_COLLECTION_NAME)
+    if not col and create:
+        col = bpy.data.collections.new(_TEXT_COLLECTION_NAME)
+        bpy.context.scene.collection.children.link(col)
+    return col
+
+
+def _clear_distance_objects():
+    col = _get_text_collection(False)
+    if col:
+        for obj in list(col.objects):
+            bpy.data.objects.remove(obj, do_unlink=True)
+
+    # Line meshes left behind by removed objects (including older per-pair WD_LineMesh_* data)
+    for mesh in list(bpy.data.meshes):
+        if mesh.users == 0 and mesh.name.startswith(("WD_LineMesh_", _LINES_OBJECT_NAME)):
+            bpy.data.meshes.remove(mesh)
+
+
+# ========= global clear =========
+
+@_profiled("redraw tagging")
+def _tag_view3d_redraw(force=False, region_types=('WINDOW',)):
+    """Tag the 3D viewport regions that show the overlay for redraw.
+
+    Without force, nothing happens unless _pairs_version moved since the last
+    tag, and tags closer together than _REDRAW_INTERVAL are merged into one
+    deferred tag. Viewports with overlays hidden never draw the distances and
+    are skipped.
+    """
+    global _tagged_version, _last_tag_time, _redraw_deferred
+
+    if not force:
+        if _tagged_version == _pairs_version:
+            return
+        wait = _last_tag_time + _REDRAW_INTERVAL - time.perf_counter()
+        if wait > 0.0:
+            if not _redraw_deferred:
+                # persistent: a file load must not drop it and leave _redraw_deferred stuck
+                bpy.app.timers.register(_deferred_view3d_redraw, first_interval=wait, persistent=True)
+                _redraw_deferred = True
+            return
+        _tagged_version = _pairs_version
+        _last_tag_time = time.perf_counter()
+
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type != 'VIEW_3D':
+                continue
+            overlays = area.spaces.active.overlay.show_overlays
+            for region in area.regions:
+                if region.type in region_types and (overlays or region.type != 'WINDOW'):
+                    region.tag_redraw()
+
+
+def _deferred_view3d_redraw():
+    """Timer side of _tag_view3d_redraw's rate limit."""
+    global _redraw_deferred
+
+    _redraw_deferred = False
+    _tag_view3d_redraw()
+    return None
+
+
+def distance_overlay_global_clear():
+    global _draw_handler, _line_draw_handler, _line_batch, _label_cache, _handler_registered
+    global _last_vertex_positions, _update_timer, _last_timer_signature
+    global _pending_full, _flush_scheduled, _measure_signature, _pair_cache
+    global _tagged_version, _redraw_deferred
+
+    _publish_pairs([])
+    _line_batch = None
+    _label_cache = None
+    _last_vertex_positions = {}
+    _last_timer_signature = None
+    _adjacency_cache.clear()
+    _pending_updates.clear()
+    _pending_full = False
+    _measure_signature = None
+    _pair_cache = None
+    _evaluated_cache.clear()
+    _bvh_cache.clear()
+    _overlap_cache.clear()
+    _sample_cache.clear()
+    _edit_coords_cache.clear()
+    _shutdown_background()
+
+    if _flush_scheduled:
+        try:
+            bpy.app.timers.unregister(_flush_depsgraph_updates)
+        except ValueError:
+            pass
+        _flush_scheduled = False
+    _clear_distance_objects()
+
+    if _draw_handler is not None:
+        try:
+            bpy.types.SpaceView3D.draw_handler_remove(_draw_handler, 'WINDOW')
+        except:
+            pass
+        _draw_handler = None
+
+    if _line_draw_handler is not None:
+        try:
+            bpy.types.SpaceView3D.draw_handler_remove(_line_draw_handler, 'WINDOW')
+        except:
+            pass
+        _line_draw_handler = None
+
+    if _update_timer is not None:
+        if bpy.app.timers.is_registered(_update_timer):
+            bpy.app.timers.unregister(_update_timer)
+        _update_timer = None
+
+    if _handler_registered:
+        if distance_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+            bpy.app.handlers.depsgraph_update_post.remove(distance_depsgraph_update)
+        if distance_frame_update in bpy.app.handlers.frame_change_post:
+            bpy.app.handlers.frame_change_post.remove(distance_frame_update)
+        _handler_registered = False
+
+    if _redraw_deferred:
+        if bpy.app.timers.is_registered(_deferred_view3d_redraw):
+            bpy.app.timers.unregister(_deferred_view3d_redraw)
+        _redraw_deferred = False
+    _tagged_version = _pairs_version
+    _tag_view3d_redraw(force=True)
+
+
+@bpy.app.handlers.persistent
+def _clear_on_load(_dummy):
+    """load_pre: switch the overlay off before another file replaces this one.
+
+    Blender drops the non-persistent depsgraph handlers on load, and every
+    geometry cache is keyed by object names that may mean other objects in
+    the next file.
+    """
+    distance_overlay_global_clear()
+
+
+# ========= selection helpers =========
+
+def _cache_valid(cache, name, key):
+    """True when cache[name] was stored under key and can still be trusted.
+
+    Per-object geometry caches put _geometry_versions in their key, but only
+    the depsgraph handler bumps those versions: without it, or while a
+    geometry update of the object waits for the flush, nothing vouches for
+    the entry. name is an object name, or a tuple of them for pair caches.
+    """
+    cached = cache.get(name)
+    if cached is None or cached[0] != key or not _handler_registered:
+        return False
+    names = name if isinstance(name, tuple) else (name,)
+    return all(_pending_updates.get(n) != 'GEOMETRY' for n in names)
+
+
+def _mesh_local_coords(mesh):
+    """Read every vertex coordinate of mesh into an (n, 3) float32 array."""
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    return co.reshape(-1, 3)
+
+
+def _evaluated_local_coords(obj):
+    """Local coords of obj after modifiers, as an (n, 3) float32 array.
+
+    to_mesh only runs again once the cached copy fails _cache_valid.
+    """
+    version = _geometry_versions.get(obj.name, 0)
+    if _cache_valid(_evaluated_cache, obj.name, version):
+        return _evaluated_cache[obj.name][1]
+
+    obj_eval = obj.evaluated_get(bpy.context.evaluated_depsgraph_get())
+    mesh = obj_eval.to_mesh()
+    try:
+        co = _mesh_local_coords(mesh)
+    finally:
+        obj_eval.to_mesh_clear()
+    _evaluated_cache[obj.name] = (version, co)
+    return co
+
+
+def _object_mode_coords(obj):
+    """Object Mode coords of obj: post-modifier when Measure Evaluated is on, else the mesh data."""
+    settings = getattr(bpy.context.scene, "distance_settings", None)
+    if settings and settings.use_evaluated:
+        return _evaluated_local_coords(obj)
+    return _mesh_local_coords(obj.data)
+
+
+def _encode_indices(indices):
+    """Pack vertex indices as sorted, delta-encoded, zlib-compressed bytes.
+
+    The first byte is the item size of the narrowest unsigned type that holds
+    every delta; contiguous selections compress to a few bytes.
+    """
+    idx = np.unique(np.asarray(indices, dtype=np.int64))
+    deltas = np.diff(idx, prepend=0)
+    largest = int(deltas.max(initial=0))
+    dtype = np.uint8 if largest < 1 << 8 else np.uint16 if largest < 1 << 16 else np.uint32
+    return bytes((np.dtype(dtype).itemsize,)) + zlib.compress(deltas.astype(dtype).tobytes())
+
+
+def _decode_indices(blob):
+    """Inverse of _encode_indices, as an int64 array."""
+    dtype = {1: np.uint8, 2: np.uint16, 4: np.uint32}[blob[0]]
+    return np.cumsum(np.frombuffer(zlib.decompress(blob[1:]), dtype=dtype), dtype=np.int64)
+
+
+def _store_locked_sets(settings, locked_sets):
+    """Write [(obj, indices), ...] as the locked selection, one binary ID property per object."""
+    for item in settings.locked_objects:
+        if item.obj is not None and _LOCK_PROP in item.obj:
+            del item.obj[_LOCK_PROP]
+    settings.locked_objects.clear()
+
+    total_verts = 0
+    for obj, indices in locked_sets:
+        obj[_LOCK_PROP] = _encode_indices(indices)
+        settings.locked_objects.add().obj = obj
+        total_verts += len(indices)
+
+    settings.locked_sets_json = "[]"  # superseded by the per-object data
+    settings.locked_count = total_verts
+    settings.lock_serial += 1
+    return total_verts
+
+
+def _compile_locked_sets(settings):
+    """Locked sets as [(obj, int64 vertex indices), ...]; obj is None if it was deleted.
+
+    Objects are held by pointer properties, so renames are harmless. The
+    binary index data is decoded lazily, once per lock (lock_serial); files
+    from older versions are still read from locked_sets_json.
+    """
+    global _locked_sets_cache
+
+    if not settings.locked_objects:
+        return _compile_legacy_locked_sets(settings.locked_sets_json)
+
+    key = (settings.as_pointer(), settings.lock_serial)
+    if _locked_sets_cache is None or _locked_sets_cache[0] != key:
+        arrays = []
+        for item in settings.locked_objects:
+            blob = item.obj.get(_LOCK_PROP) if item.obj is not None else None
+            arrays.append(_decode_indices(bytes(blob)) if blob else np.empty(0, dtype=np.int64))
+        _locked_sets_cache = (key, arrays)
+    return [(item.obj, idx) for item, idx in zip(settings.locked_objects, _locked_sets_cache[1])]
+
+
+def _compile_legacy_locked_sets(locked_sets_json):
+    """Pre-binary locked sets stored by object name in JSON, parsed once per string."""
+    global _locked_sets_cache
+
+    key = ('JSON', locked_sets_json)
+    if _locked_sets_cache is None or _locked_sets_cache[0] != key:
+        try:
+            entries = json.loads(locked_sets_json or "[]") or []
+        except Exception:
+            entries = []
+        compiled = [(entry.get("obj"), np.asarray(entry.get("verts") or [], dtype=np.int64))
+                    for entry in entries if isinstance(entry, dict)]
+        _locked_sets_cache = (key, compiled)
+    return [(bpy.data.objects.get(name or ""), idx) for name, idx in _locked_sets_cache[1]]
+
+
+def _active_locked_sets(settings):
+    """Compiled locked sets while Lock Selection is on, else an empty list."""
+    return _compile_locked_sets(settings) if settings.lock_selection else []
+
+
+@bpy.app.handlers.persistent
+def _migrate_locked_sets(_dummy):
+    """load_post: move JSON locked sets from older files into binary per-object storage."""
+    for scene in bpy.data.scenes:
+        settings = getattr(scene, "distance_settings", None)
+        if settings is None or settings.locked_objects:
+            continue
+        legacy = [(obj, idx) for obj, idx in _compile_legacy_locked_sets(settings.locked_sets_json)
+                  if obj is not None and obj.type == 'MESH' and len(idx)]
+        if legacy:
+            _store_locked_sets(settings, legacy)
+
+
+def _sample_indices(obj, kind, co, budget):
+    """Positions in co of at most budget representative vertices, see core.voxel_sample.
+
+    Sampling is done in local space, so the result only depends on geometry
+    and is cached per object (see _cache_valid); kind tells apart the vertex
+    sets one object can be sampled from.
+    """
+    if len(co) <= budget:
+        return np.arange(len(co))
+    key = (kind, _geometry_versions.get(obj.name, 0), len(co), budget)
+    if _cache_valid(_sample_cache, obj.name, key):
+        return _sample_cache[obj.name][1]
+    picked = core.voxel_sample(co, budget)
+    _sample_cache[obj.name] = (key, picked)
+    return picked
+
+
+def _object_mode_source(obj, slot):
+    """Object Mode sampling source: every vert of obj, read in bulk."""
+    evaluated = bpy.context.scene.distance_settings.use_evaluated
+    return obj, slot, ('OBJECT', evaluated), _object_mode_coords(obj), None, None
+
+
+def _edit_mode_source(obj, slot):
+    """Edit Mode sampling source: the selected BMVerts of obj, or None without a selection."""
+    bm = bmesh.from_edit_mesh(obj.data)
+    bm.verts.index_update()
+
+    selected_bm_verts = set()
+
+    for v in bm.verts:
+        if v.select:
+            selected_bm_verts.add(v)
+    for e in bm.edges:
+        if e.select:
+            selected_bm_verts.update(e.verts)
+    for f in bm.faces:
+        if f.select:
+            selected_bm_verts.update(f.verts)
+
+    if not selected_bm_verts:
+        return None
+
+    sel = sorted(selected_bm_verts, key=lambda v: v.index)
+    indices = np.array([v.index for v in sel], dtype=np.int64)
+    co = np.array([v.co for v in sel], dtype=np.float32)
+    return obj, slot, ('EDIT', zlib.crc32(indices)), co, indices, bm
+
+
+def _source_weight(co, matrix_world):
+    """Surface area of co's bounding box, scaled like obj but not rotated.
+
+    Rotation would change a world-space box and with it the budget split,
+    so every frame of a turn would resample. Sides under 1% of the longest
+    are raised to it, so flat or straight selections still get a share.
+    """
+    if not len(co):
+        return 0.0
+    size = (co.max(axis=0) - co.min(axis=0)).astype(np.float64)
+    size *= np.linalg.norm(np.array(matrix_world, dtype=np.float64)[:3, :3], axis=0)
+    size = np.maximum(size, size.max() * 0.01)
+    return float(size[0] * size[1] + size[1] * size[2] + size[2] * size[0])
+
+
+def _sample_sources(sources, max_vertices, verts_out, keys_out, per_obj_out):
+    """Split max_vertices across sources (see core.split_budget) and sample each.
+
+    Shares follow _source_weight, so a dense object cannot crowd sparser ones
+    out of the budget. A source is (obj, slot, sample kind, local coords,
+    vertex indices or None for all, BMesh or None); those with indices feed
+    the adjacency search through per_obj_out.
+    """
+    counts = [len(co) for _obj, _slot, _kind, co, _indices, _bm in sources]
+    weights = [_source_weight(co, obj.matrix_world) for obj, _slot, _kind, co, _indices, _bm in sources]
+    budgets = core.split_budget(counts, weights, max_vertices)
+
+    for (obj, slot, kind, co, indices, bm), budget in zip(sources, budgets.tolist()):
+        if not budget:
+            continue
+        picked = _sample_indices(obj, kind, co, budget)
+        world = core.to_world(co[picked], obj.matrix_world)
+        idx = picked if indices is None else indices[picked]
+        verts_out.append(world)
+        keys_out.append(core.vertex_keys(slot, idx))
+        if indices is not None:
+            per_obj_out.append((obj, slot, bm, idx, world))
+
+
+# ========= adjacency graph =========
+
+def _mesh_adjacency(obj, bm=None):
+    """CSR adjacency of obj's mesh (or its edit BMesh), cached until its geometry changes.
+
+    Equal vertex and edge counts do not prove the edges are the same, so the
+    key carries the geometry version too (see _cache_valid).
+    """
+    mesh = obj.data
+    version = _geometry_versions.get(obj.name, 0)
+    if bm is not None:
+        signature = ('EDIT', len(bm.verts), len(bm.edges), mesh.as_pointer(), version)
+    else:
+        signature = ('OBJECT', len(mesh.vertices), len(mesh.edges), mesh.as_pointer(), version)
+
+    if _cache_valid(_adjacency_cache, obj.name, signature):
+        return _adjacency_cache[obj.name][1:]
+
+    if bm is not None:
+        edges = np.array([(e.verts[0].index, e.verts[1].index) for e in bm.edges], dtype=np.int64)
+    else:
+        edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+        mesh.edges.foreach_get("vertices", edges)
+        edges = edges.astype(np.int64)
+
+    indptr, indices = core.build_csr(signature[1], edges.reshape(-1, 2))
+    _adjacency_cache[obj.name] = (signature, indptr, indices)
+    return indptr, indices
+
+
+# ========= pair collection =========
+
+def collect_vertex_pairs(max_mm, max_vertices, max_pairs, neighbor_depth, locked_sets=()):
+    """
+    - Object Mode: global shortest pairs over verts of selected meshes.
+    - Edit Mode:
+        - If locked: use stored per-object vertex indices.
+        - Else: use current selection and adjacency steps.
+    """
+    pairs, _slot_names = _collect_keyed_vertex_pairs(
+        max_mm, max_vertices, max_pairs, neighbor_depth, locked_sets)
+    return [(a, b, d) for a, b, d, _key in pairs]
+
+
+def _collect_keyed_vertex_pairs(max_mm, max_vertices, max_pairs, neighbor_depth, locked_sets=()):
+    """collect_vertex_pairs, keeping identities.
+
+    Returns ([(a, b, dist, pair_key), ...], slot_names) where slot_names maps
+    the object slot packed in each vertex identity back to an object name.
+    """
+    measured = _collect_measured_vertices(max_vertices, locked_sets)
+
+    start = time.perf_counter_ns() if _profiling else 0
+    top = core.TopPairs(max_pairs)
+    for a, b, d_mm, key_a, key_b in _iter_candidate_pairs(measured, max_mm, neighbor_depth, top.bound):
+        top.push(a, b, d_mm, key_a, key_b)
+    if start:
+        _profile_record("pair search + dedupe", start)
+        start = time.perf_counter_ns()
+
+    pairs = _vector_pairs(top.result())
+    if start:
+        _profile_record("sort", start)
+    return pairs, measured[3]
+
+
+def _vector_pairs(pairs):
+    """core pair results with mathutils Vector endpoints, as the draw and export code expect."""
+    return [(Vector(a), Vector(b), d, key) for a, b, d, key in pairs]
+
+
+@_profiled("vertex collection")
+def _collect_measured_vertices(max_vertices, locked_sets=()):
+    """Gather the vertices to measure from the locked sets (see _active_locked_sets) or the current selection.
+
+    Returns (coords, keys, per_obj_edit, slot_names): world-space (n, 3) coords
+    with their int64 identities, the per-object adjacency sources, and the
+    object name of every slot.
+    """
+    verts_global = []  # list of (n, 3) world-space coordinate arrays
+    keys_global = []   # matching int64 vertex identities, see core.vertex_keys
+    per_obj_edit = []  # list of (obj, slot, bm or None, vertex indices, (n, 3) world coords)
+
+    active = bpy.context.view_layer.objects.active
+    in_edit = active and active.type == 'MESH' and active.mode == 'EDIT'
+
+    # Locked branch: rebuild from stored sets
+    slot_names = []
+    if locked_sets:
+        slot_names = [obj.name if obj else "" for obj, _indices in locked_sets]
+        sources = []
+        for slot, (obj, idx) in enumerate(locked_sets):
+            if not obj or obj.type != 'MESH':
+                continue
+            co = _mesh_local_coords(obj.data)
+            idx = idx[(idx >= 0) & (idx < len(co))]
+            if len(idx):
+                sources.append((obj, slot, ('LOCKED', zlib.crc32(idx)), co[idx], idx, None))
+        _sample_sources(sources, max_vertices, verts_global, keys_global, per_obj_edit)
+
+    # Normal collection when not locked or lock invalid
+    if not verts_global and not per_obj_edit:
+        slot_names = [obj.name for obj in bpy.context.selected_objects]
+        sources = []
+        for slot, obj in enumerate(bpy.context.selected_objects):
+            if obj.type != 'MESH':
+                continue
+            if in_edit and obj.mode == 'EDIT':
+                source = _edit_mode_source(obj, slot)
+            else:
+                source = _object_mode_source(obj, slot)
+            if source is not None:
+                sources.append(source)
+        _sample_sources(sources, max_vertices, verts_global, keys_global, per_obj_edit)
+
+    coords = np.concatenate(verts_global) if verts_global else np.empty((0, 3), dtype=np.float32)
+    keys = np.concatenate(keys_global) if keys_global else np.empty(0, dtype=np.int64)
+    return coords, keys, per_obj_edit, slot_names
+
+
+def _iter_candidate_pairs(measured, max_mm, neighbor_depth, bound=None):
+    """Yield (a, b, dist, key_a, key_b) for every pair within max_mm, each pair once.
+
+    If given, bound() returns the distance a candidate still has to beat; the
+    KD-tree radius and the adjacency sweep tighten to it as it drops.
+    """
+    coords, keys, per_obj_edit, _slot_names = measured
+    scale_length = bpy.context.scene.unit_settings.scale_length
+
+    # 1) global shortest pairs
+    yield from core.iter_global_pairs(coords, keys, max_mm, scale_length, bound)
+
+    # 2) adjacency: expand all selected verts at once over the cached CSR graph
+    if neighbor_depth > 0:
+        for entry in per_obj_edit:
+            candidates = _adjacency_candidates(entry, neighbor_depth, max_mm, scale_length)
+            yield from core.iter_sorted_candidates(candidates, bound)
+
+
+def _adjacency_candidates(entry, neighbor_depth, max_mm, scale_length):
+    """core.adjacency_candidates of one per_obj_edit entry, reading coords from its mesh or BMesh."""
+    obj, slot, bm, src_idx, src_world = entry
+
+    def lookup_world(uniq):
+        if bm is not None:
+            bm.verts.ensure_lookup_table()
+            local = np.array([bm.verts[i].co for i in uniq.tolist()], dtype=np.float32).reshape(-1, 3)
+        else:
+            local = _mesh_local_coords(obj.data)[uniq]
+        return core.to_world(local, obj.matrix_world)
+
+    indptr, indices = _mesh_adjacency(obj, bm)
+    return core.adjacency_candidates(indptr, indices, src_idx, src_world, lookup_world,
+                                     neighbor_depth, max_mm, scale_length, slot)
+
+
+def _adjacency_job(entry, neighbor_depth, max_mm, scale_length):
+    """_adjacency_candidates of a mesh entry as a callable that needs no bpy, or None for BMesh entries.
+
+    Mesh coordinates copy out in one foreach_get, so the BFS and the lookup
+    can both run in the worker. BMesh coordinates are read one vertex at a
+    time, and which vertices are needed is only known after the BFS.
+    """
+    obj, slot, bm, src_idx, src_world = entry
+    if bm is not None:
+        return None
+    local = _mesh_local_coords(obj.data)
+    mat = np.array(obj.matrix_world, dtype=np.float32)
+    indptr, indices = _mesh_adjacency(obj)
+    return functools.partial(core.adjacency_candidates, indptr, indices, src_idx, src_world,
+                             lambda uniq: core.to_world(local[uniq], mat),
+                             neighbor_depth, max_mm, scale_length, slot)
+
+
+# ========= object clearance =========
+
+def _clearance_active(settings):
+    """Clearance replaces vertex pairs in Object Mode, for unlocked selections only."""
+    active = bpy.context.view_layer.objects.active
+    in_edit = active and active.type == 'MESH' and active.mode == 'EDIT'
+    return settings.clearance_mode and not in_edit and not settings.lock_selection
+
+
+def _surface_reach(mesh, co):
+    """(indices of the vertices faces use, reach) of mesh, in local units.
+
+    Every point of a face lies within reach of one of its corners: the face
+    sits in the convex hull of its corners, which all lie within the largest
+    distance from its first corner to the others.
+    """
+    loop_vert = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vert)
+    starts = np.empty(len(mesh.polygons), dtype=np.int32)
+    totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", starts)
+    mesh.polygons.foreach_get("loop_total", totals)
+    if not len(starts):
+        return np.empty(0, dtype=np.int64), 0.0
+
+    loops = np.repeat(starts - (np.cumsum(totals) - totals), totals) + np.arange(int(totals.sum()))
+    corners = loop_vert[loops]
+    first = np.repeat(loop_vert[starts], totals)
+    reach = float(np.linalg.norm(co[corners] - co[first], axis=1).max())
+    return np.unique(corners).astype(np.int64), reach
+
+
+def _object_bvh(obj, use_evaluated):
+    """(BMesh, BVHTree, local coords, surface vertex indices, reach) of obj, cached until its geometry changes.
+
+    Everything is in local space so it stays valid while the object moves.
+    The BMesh is kept for _overlap_point, reach and the surface vertices for
+    _nearest_on_surface.
+    """
+    key = (_geometry_versions.get(obj.name, 0), use_evaluated, len(obj.data.vertices), len(obj.data.polygons))
+    if _cache_valid(_bvh_cache, obj.name, key):
+        return _bvh_cache[obj.name][1:]
+
+    obj_eval = obj.evaluated_get(bpy.context.evaluated_depsgraph_get()) if use_evaluated else None
+    mesh = obj_eval.to_mesh() if obj_eval is not None else obj.data
+    try:
+        co = _mesh_local_coords(mesh)
+        surface, reach = _surface_reach(mesh, co)
+        bm = bmesh.new()
+        bm.from_mesh(mesh)
+    finally:
+        if obj_eval is not None:
+            obj_eval.to_mesh_clear()
+    tree = BVHTree.FromBMesh(bm)
+    _bvh_cache[obj.name] = (key, bm, tree, co, surface, reach)
+    return bm, tree, co, surface, reach
+
+
+def _overlap_point(shape_a, shape_b, use_evaluated):
+    """World point where the surfaces of two clearance shapes intersect, or None.
+
+    BVHTree.overlap needs both trees in one space, so a copy of the smaller
+    BMesh is moved into the other object's local space. The answer is cached
+    per object pair until either geometry or their relative placement changes.
+    """
+    if len(shape_a[1].verts) < len(shape_b[1].verts):
+        shape_a, shape_b = shape_b, shape_a
+    obj_a, bm_a, tree_a = shape_a[:3]
+    obj_b, bm_b = shape_b[:2]
+
+    rel = obj_a.matrix_world.inverted() @ obj_b.matrix_world
+    key = (_geometry_versions.get(obj_a.name, 0), _geometry_versions.get(obj_b.name, 0), use_evaluated,
+           tuple(itertools.chain.from_iterable(rel)))
+    if _cache_valid(_overlap_cache, (obj_a.name, obj_b.name), key):
+        point = _overlap_cache[(obj_a.name, obj_b.name)][1]
+    else:
+        moved = bm_b.copy()
+        try:
+            moved.transform(rel)
+            hits = tree_a.overlap(BVHTree.FromBMesh(moved))
+        finally:
+            moved.free()
+        point = None
+        if hits:
+            bm_a.faces.ensure_lookup_table()
+            point = bm_a.faces[hits[0][0]].calc_center_median()
+        _overlap_cache[(obj_a.name, obj_b.name)] = (key, point)
+    return None if point is None else obj_a.matrix_world @ point
+
+
+def _nearest_on_surface(src_world, dst, best):
+    """Closest (distance, src point, surface point) from src_world onto the dst shape within best.
+
+    Vertex to vertex distances bound the clearance of each source point from
+    both sides: a surface vertex lies on the surface, and every surface point
+    has a face corner within reach. The radius search finds the best vertex
+    to vertex distance first; only points whose nearest surface vertex minus
+    reach can still beat it go to BVHTree.find_nearest, nearest first.
+    """
+    dst_obj, _bm, dst_tree, _world, dst_box, dst_surface, dst_reach = dst
+    lo, hi = dst_box
+    box_dist = np.linalg.norm(np.maximum(np.maximum(lo - src_world, src_world - hi), 0.0), axis=1)
+    near = np.flatnonzero(box_dist < best)
+    if not len(near) or not len(dst_surface):
+        return None
+    pts = src_world[near]
+
+    cap = best + dst_reach
+    radius = min(cap, max(dst_reach, best / 64.0))
+    while True:
+        i, j, d = core.cross_radius_pair_arrays(pts, dst_surface, radius)
+        if len(d) or radius >= cap:
+            break
+        radius = min(radius * 2.0, cap)
+    if not len(d):
+        return None
+    upper = min(best, float(d.min()))
+    if upper + dst_reach > radius:
+        i, j, d = core.cross_radius_pair_arrays(pts, dst_surface, upper + dst_reach)
+
+    nn = np.full(len(pts), np.inf)
+    np.minimum.at(nn, i, d)
+    candidates = np.flatnonzero(nn - dst_reach < upper)
+    candidates = candidates[np.argsort(nn[candidates])]
+
+    mat = np.array(dst_obj.matrix_world, dtype=np.float64)
+    inv = np.linalg.inv(mat)
+    local = pts[candidates] @ inv[:3, :3].T + inv[:3, 3]
+    # find_nearest measures in dst's local space; shrink the limit by its smallest stretch
+    min_scale = float(np.linalg.svd(mat[:3, :3], compute_uv=False).min()) or 1.0
+
+    found = None
+    for k, co in zip(candidates.tolist(), local.tolist()):
+        if nn[k] - dst_reach >= best:
+            break
+        hit = dst_tree.find_nearest(co, best / min_scale)
+        if hit[0] is None:
+            continue
+        surface = mat[:3, :3] @ np.array(hit[0]) + mat[:3, 3]
+        dist = float(np.linalg.norm(surface - pts[k]))
+        if dist < best:
+            best = dist
+            found = (dist, pts[k], surface)
+    return found
+
+
+@_profiled("clearance")
+def _clearance_pairs(settings):
+    """Minimum surface clearance between every two selected mesh objects within Max Distance.
+
+    Each object pair contributes its closest approach: the nearer of the
+    vertex to surface searches in both directions against cached per-object
+    BVH trees, or 0 where the surfaces intersect. BVHTree.overlap only runs
+    when both searches came within reach, see _overlap_point.
+    Returns ([(a, b, dist, pair_key), ...], slot_names) sorted by distance,
+    like _collect_keyed_vertex_pairs.
+    """
+    objs = [obj for obj in bpy.context.selected_objects if obj.type == 'MESH']
+    scale_length = bpy.context.scene.unit_settings.scale_length
+    limit = settings.max_mm * scale_length
+
+    shapes = []
+    for obj in objs:
+        bm, tree, co, surface, reach = _object_bvh(obj, settings.use_evaluated)
+        world = core.to_world(co, obj.matrix_world).astype(np.float64)
+        box = (world.min(axis=0), world.max(axis=0)) if len(world) else None
+        stretch = float(np.linalg.norm(np.array(obj.matrix_world)[:3, :3], 2))
+        shapes.append((obj, bm, tree, world, box, world[surface], reach * stretch))
+
+    pairs = []
+    for slot_a, slot_b in itertools.combinations(range(len(shapes)), 2):
+        shape_a, shape_b = shapes[slot_a], shapes[slot_b]
+        box_a, box_b = shape_a[4], shape_b[4]
+        if box_a is None or box_b is None:
+            continue
+        gap = np.linalg.norm(np.maximum(np.maximum(box_a[0] - box_b[1], box_b[0] - box_a[1]), 0.0))
+        if gap > limit:
+            continue
+        key = core.pair_key(core.vertex_keys(slot_a, 0), core.vertex_keys(slot_b, 0))
+
+        best = None
+        found = _nearest_on_surface(shape_a[3], shape_b, limit)
+        # Every corner of a face through an intersection point lies within
+        # the face's reach of it, so each direction can rule intersections out
+        may_intersect = (found[0] if found else limit) <= shape_a[6]
+        if found:
+            best = found
+        bound = best[0] if best else limit
+        found = _nearest_on_surface(shape_b[3], shape_a, bound)
+        may_intersect = may_intersect and (found[0] if found else bound) <= shape_b[6]
+        if found:
+            best = (found[0], found[2], found[1])  # keep a on obj_a
+
+        if may_intersect and gap == 0.0:
+            point = _overlap_point(shape_a, shape_b, settings.use_evaluated)
+            if point is not None:
+                pairs.append((point.copy(), point.copy(), 0.0, key))
+                continue
+        if best:
+            dist, a, b = best
+            pairs.append((Vector(a), Vector(b), dist / scale_length, key))
+
+    pairs.sort(key=lambda pair: pair[2])
+    return pairs[:settings.max_pairs], [obj.name for obj in objs]
+
+
+# ========= text objects (3D fallback) =========
+
+def update_text_objects():
+    """Update 3D text objects at line midpoints (fallback)"""
+    col = _get_text_collection(True)
+    _clear_text_objects()
+
+    for idx, (va, vb, dist_mm) in enumerate(_gpu_pairs):
+        txt_data = bpy.data.curves.new(name=f"WD_Text_{idx}", type='FONT')
+        txt_data.body = f"{dist_mm:.2f} mm"
+        txt_data.align_x = 'CENTER'
+        txt_data.align_y = 'CENTER'
+        txt_data.size = 0.05  # Smaller size for better positioning
+
+        txt_obj = bpy.data.objects.new(f"WD_TextObj_{idx}", txt_data)
+        mid = (va + vb) * 0.5
+        txt_obj.location = mid
+
+        # Simple upright orientation (no billboarding for now)
+        txt_obj.rotation_euler = (0, 0, 0)  # Face upward in world space
+        col.objects.link(txt_obj)
+
+
+# ========= 3D mesh lines =========
+
+def _get_lines_object(col):
+    """The single pooled line object, created on first use."""
+    obj = bpy.data.objects.get(_LINES_OBJECT_NAME)
+    if obj is not None and obj.type == 'MESH':
+        return obj
+
+    # Create or get grey material for lines
+    mat_name = "WD_DistanceLine_Material"
+    mat = bpy.data.materials.get(mat_name)
+    if not mat:
+        mat = bpy.data.materials.new(name=mat_name)
+        mat.diffuse_color = (0.5, 0.5, 0.5, 1.0)  # Grey color
+        mat.use_nodes = False  # Use legacy material
+
+    mesh = bpy.data.meshes.new(name=_LINES_OBJECT_NAME)
+    mesh.materials.append(mat)  # Assign grey material
+    obj = bpy.data.objects.new(_LINES_OBJECT_NAME, mesh)
+    col.objects.link(obj)
+    return obj
+
+
+@_profiled("update_mesh_lines")
+def update_mesh_lines():
+    """Write all distance lines into one pooled mesh, resized and refilled in place"""
+    col = _get_text_collection(True)
+    mesh = _get_lines_object(col).data
+
+    n = len(_gpu_pairs)
+    if len(mesh.edges) != n or len(mesh.vertices) != 2 * n:
+        mesh.clear_geometry()
+        mesh.vertices.add(2 * n)
+        mesh.edges.add(n)
+        mesh.edges.foreach_set("vertices", np.arange(2 * n, dtype=np.int32))
+
+    co = np.array([(va, vb) for va, vb, _dist in _gpu_pairs], dtype=np.float32)
+    mesh.vertices.foreach_set("co", co.ravel())
+    mesh.update()
+
+
+# ========= vertex position tracking =========
+
+def _position_entry(co, matrix_world):
+    """Tracked state of one object: (fingerprint, local coords, matrix_world array).
+
+    The fingerprint is a CRC over the raw local coordinate and matrix buffers,
+    so an unchanged object is recognised without any per-vertex float math.
+    """
+    co = np.ascontiguousarray(co, dtype=np.float32)
+    mat = np.array(matrix_world, dtype=np.float32)
+    return zlib.crc32(co, zlib.crc32(mat)), co, mat
+
+
+def _edit_mode_coords(obj, idx=None):
+    """Local coords of obj's selected BMVerts, or of the vertex indices idx, while obj is in Edit Mode.
+
+    Reading them walks the BMesh in Python, so the result is cached (see
+    _cache_valid); Edit Mode edits and selection changes both arrive as
+    mesh updates, see _classify_depsgraph_updates.
+    """
+    key = (_geometry_versions.get(obj.name, 0), None if idx is None else (len(idx), zlib.crc32(idx)))
+    if _cache_valid(_edit_coords_cache, obj.name, key):
+        return _edit_coords_cache[obj.name][1]
+
+    bm = bmesh.from_edit_mesh(obj.data)
+    if idx is None:
+        co = np.array([v.co for v in bm.verts if v.select], dtype=np.float32).reshape(-1, 3)
+    else:
+        bm.verts.ensure_lookup_table()
+        co = np.array([bm.verts[i].co for i in idx.tolist()
+                       if 0 <= i < len(bm.verts)], dtype=np.float32).reshape(-1, 3)
+    _edit_coords_cache[obj.name] = (key, co)
+    return co
+
+
+@_profiled("position poll")
+def get_current_vertex_positions():
+    """Get current positions of all relevant vertices, as {obj_name: _position_entry(...)}"""
+    positions = {}
+    settings = getattr(bpy.context.scene, "distance_settings", None)
+    if not settings:
+        return positions
+
+    active = bpy.context.view_layer.objects.active
+    in_edit = active and active.type == 'MESH' and active.mode == 'EDIT'
+
+    # Collect positions based on current mode and settings
+    locked_sets = _active_locked_sets(settings)
+
+    if locked_sets:
+        for obj, idx in locked_sets:
+            if not obj or obj.type != 'MESH':
+                continue
+
+            if in_edit and obj.mode == 'EDIT':
+                co = _edit_mode_coords(obj, idx)
+            else:
+                co = _mesh_local_coords(obj.data)
+                co = co[idx[(idx >= 0) & (idx < len(co))]]
+            positions[obj.name] = _position_entry(co, obj.matrix_world)
+    else:
+        for obj in bpy.context.selected_objects:
+            if obj.type != 'MESH':
+                continue
+
+            if in_edit and obj.mode == 'EDIT':
+                co = _edit_mode_coords(obj)
+            else:
+                co = _object_mode_coords(obj)
+            positions[obj.name] = _position_entry(co, obj.matrix_world)
+
+    return positions
+
+
+def positions_changed(old_positions, new_positions, threshold=0.001):
+    """Check if vertex positions have changed significantly.
+
+    Objects with matching fingerprints are skipped outright; only the others
+    pay for a vectorized world-space max-delta check against threshold.
+    """
+    if old_positions.keys() != new_positions.keys():
+        return True  # Different set of objects
+
+    for key, (old_hash, old_co, old_mat) in old_positions.items():
+        new_hash, new_co, new_mat = new_positions[key]
+        if old_hash == new_hash:
+            continue
+        if old_co.shape != new_co.shape:
+            return True  # Different set of vertices
+        delta = core.to_world(new_co, new_mat) - core.to_world(old_co, old_mat)
+        if len(delta) and np.einsum('ij,ij->i', delta, delta).max() > threshold * threshold:
+            return True
+    return False
+
+
+# ========= local-space pair cache =========
+
+def _cache_pairs(signature, slot_names, pairs):
+    """Remember pairs in each endpoint's local space, tagged with the current geometry versions.
+
+    The matrix of every measured object is recorded, not only of those in a
+    pair: moving any of them relative to the others can change the result.
+    """
+    global _pair_cache
+
+    objs = {name: bpy.data.objects.get(name) for name in set(slot_names) if name}
+    if not pairs or any(obj is None for obj in objs.values()):
+        _pair_cache = None
+        return
+
+    keys = [key for _a, _b, _d, key in pairs]
+    slots = np.array([(va[0], vb[0]) for va, vb in map(core.split_pair_key, keys)], dtype=np.int64)
+    world = np.array([(a, b) for a, b, _d, _key in pairs], dtype=np.float64)  # (k, 2, 3)
+
+    matrices = {slot: np.array(objs[name].matrix_world, dtype=np.float64)
+                for slot, name in enumerate(slot_names) if name}
+    local = np.empty_like(world)
+    for slot in np.unique(slots).tolist():
+        inv = np.linalg.inv(matrices[slot])
+        mask = slots == slot
+        local[mask] = world[mask] @ inv[:3, :3].T + inv[:3, 3]
+
+    versions = {name: _geometry_versions.get(name, 0) for name in objs}
+    _pair_cache = (signature, slot_names, matrices, slots, local, keys, versions)
+
+
+def _retransform_cached_pairs(signature):
+    """Re-place cached pairs after transform-only changes, without searching again.
+
+    Valid only when geometry is unchanged and every measured object moved by
+    the same rigid delta, so that all distances (and hence the selection) are
+    preserved. Returns the pairs, or None when a full search is needed.
+    """
+    if _pair_cache is None:
+        return None
+    cached_signature, slot_names, matrices, slots, local, keys, versions = _pair_cache
+    if cached_signature != signature:
+        return None
+    if any(_geometry_versions.get(name, 0) != version for name, version in versions.items()):
+        return None
+
+    current = {}
+    delta = None
+    for slot, old in matrices.items():
+        obj = bpy.data.objects.get(slot_names[slot])
+        if obj is None:
+            return None
+        mat = np.array(obj.matrix_world, dtype=np.float64)
+        step = mat @ np.linalg.inv(old)
+        if delta is None:
+            delta = step
+            linear = delta[:3, :3]
+            if not np.allclose(linear.T @ linear, np.eye(3), atol=1e-6):
+                return None  # scale or shear changes distances
+        elif not np.allclose(step, delta, atol=1e-6):
+            return None  # objects moved relative to each other
+        current[slot] = mat
+
+    # One batched re-transform per object of every cached endpoint
+    world = np.empty_like(local)
+    for slot in np.unique(slots).tolist():
+        mat = current[slot]
+        mask = slots == slot
+        world[mask] = local[mask] @ mat[:3, :3].T + mat[:3, 3]
+
+    scale_length = bpy.context.scene.unit_settings.scale_length
+    dists = np.linalg.norm(world[:, 0] - world[:, 1], axis=1) / scale_length
+    order = np.argsort(dists, kind='stable')
+    return [(Vector(world[k, 0]), Vector(world[k, 1]), float(dists[k]), keys[k]) for k in order.tolist()]
+
+
+# ========= background computation =========
+
+def _take_snapshot(settings):
+    """Copy everything the pair search needs out of bpy, on the main thread.
+
+    The radius search, top-k selection and the adjacency expansion of mesh
+    entries (see _adjacency_job) then run from this snapshot alone; only
+    Edit Mode entries are expanded here, as their lookup reads the BMesh.
+    """
+    measured = _collect_measured_vertices(
+        settings.max_vertices, _active_locked_sets(settings))
+    coords, keys, per_obj_edit, slot_names = measured
+    scale_length = bpy.context.scene.unit_settings.scale_length
+
+    adjacency, expansions = [], []
+    if settings.neighbor_depth > 0:
+        for entry in per_obj_edit:
+            job = _adjacency_job(entry, settings.neighbor_depth, settings.max_mm, scale_length)
+            if job is None:
+                adjacency.append(_adjacency_candidates(entry, settings.neighbor_depth, settings.max_mm,
+                                                       scale_length))
+            else:
+                expansions.append(job)
+    return coords, keys, adjacency, expansions, slot_names, settings.max_mm, settings.max_pairs, scale_length
+
+
+def _search_snapshot(snapshot):
+    """Worker side: top-k pairs of a snapshot, as ([(a, b, dist, pair_key), ...], slot_names, elapsed ns).
+
+    Uses core.top_pair_arrays, whose NumPy calls release the GIL, so the UI
+    keeps running while the worker searches. The elapsed time is recorded
+    by _poll_background_pairs on the main thread, not here.
+    """
+    start = time.perf_counter_ns()
+    coords, keys, adjacency, expansions, slot_names, max_mm, max_pairs, scale_length = snapshot
+
+    adjacency = adjacency + [expand() for expand in expansions]
+    pairs = core.top_pair_arrays(coords, keys, max_mm, max_pairs, scale_length, adjacency)
+    return _vector_pairs(pairs), slot_names, time.perf_counter_ns() - start
+
+
+def _submit_snapshot(settings, signature):
+    """Hand a fresh snapshot to the worker; only the newest one is ever queued."""
+    global _bg_executor, _bg_future, _bg_next, _bg_serial
+
+    _bg_serial += 1
+    job = (_bg_serial, signature, _take_snapshot(settings))
+    if _bg_executor is None:
+        _bg_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="WorldDistances")
+    if _bg_future is None:
+        _bg_future = (job[0], job[1], _bg_executor.submit(_search_snapshot, job[2]))
+        _bg_next = None
+    else:
+        _bg_next = job  # replaces any older snapshot still waiting
+
+
+def _poll_background_pairs(settings):
+    """Publish a finished worker result unless a newer snapshot superseded it.
+
+    Called from the update timer. Returns True while a search is still in
+    flight, so the timer can keep polling quickly.
+    """
+    global _bg_future, _bg_next
+
+    if _bg_future is None:
+        return False
+    serial, signature, future = _bg_future
+    if not future.done():
+        return True
+
+    _bg_future = None
+    if _bg_next is not None:
+        next_serial, next_signature, snapshot = _bg_next
+        _bg_future = (next_serial, next_signature, _bg_executor.submit(_search_snapshot, snapshot))
+        _bg_next = None
+
+    if future.cancelled():
+        return _bg_future is not None
+    if future.exception() is not None:
+        print("World Distances: background search failed")
+        traceback.print_exception(future.exception())
+        return _bg_future is not None
+    pairs, slot_names, elapsed_ns = future.result()
+    if _profiling:
+        _profile_add("background search", elapsed_ns)
+    if serial == _bg_serial:
+        _cache_pairs(signature, slot_names, pairs)
+        _apply_pairs(settings, pairs)
+    return _bg_future is not None
+
+
+def _shutdown_background():
+    global _bg_executor, _bg_future, _bg_next
+
+    if _bg_executor is not None:
+        _bg_executor.shutdown(wait=False, cancel_futures=True)
+        _bg_executor = None
+    _bg_future = None
+    _bg_next = None
+
+
+# ========= update handlers =========
+
+def distance_update(transform_only=False, trigger='operator'):
+    """Update distances and redraw.
+
+    With transform_only, the cached pairs are re-placed in one batch when
+    possible instead of repeating the selection and search. trigger
+    ('timer', 'depsgraph' or 'operator') only labels the profiling stats.
+    """
+    if not _profiling:
+        return _distance_update(transform_only)
+    start = time.perf_counter_ns()
+    try:
+        _distance_update(transform_only)
+    finally:
+        _profile_record(f"distance_update ({trigger})", start)
+
+
+def _distance_update(transform_only):
+    settings = getattr(bpy.context.scene, "distance_settings", None)
+    if not settings:
+        return
+
+    signature = _measurement_signature(settings, _measured_objects(settings))
+    pairs = _retransform_cached_pairs(signature) if transform_only else None
+
+    if pairs is None and _clearance_active(settings):
+        pairs, slot_names = _clearance_pairs(settings)
+        _cache_pairs(signature, slot_names, pairs)
+
+    if pairs is None:
+        if settings.background_compute:
+            # Results come back through distance_timer_update
+            _submit_snapshot(settings, signature)
+            return
+
+        # Recalculate distances
+        pairs, slot_names = _collect_keyed_vertex_pairs(
+            settings.max_mm,
+            settings.max_vertices,
+            settings.max_pairs,
+            settings.neighbor_depth,
+            _active_locked_sets(settings),
+        )
+        _cache_pairs(signature, slot_names, pairs)
+
+    _apply_pairs(settings, pairs)
+
+
+def _apply_pairs(settings, pairs):
+    """Publish freshly computed pairs and refresh lines and viewports if they changed."""
+    if not _publish_pairs([(a, b, d) for a, b, d, _key in pairs]):
+        return
+
+    # Optional scene-object copy of the lines (GPU lines are always drawn)
+    if settings.use_mesh_lines:
+        update_mesh_lines()
+    elif bpy.data.objects.get(_LINES_OBJECT_NAME):
+        _clear_distance_objects()
+
+    _tag_view3d_redraw()
+
+
+def _measured_objects(settings):
+    """Mesh objects whose vertices currently feed the overlay."""
+    if settings.lock_selection:
+        objs = [obj for obj, _indices in _compile_locked_sets(settings)]
+        objs = [obj for obj in objs if obj and obj.type == 'MESH']
+        if objs:
+            return objs
+    return [obj for obj in bpy.context.selected_objects if obj.type == 'MESH']
+
+
+def _measurement_signature(settings, measured):
+    """Everything besides geometry and transforms that decides which pairs are shown."""
+    return (
+        tuple((obj.name, obj.mode) for obj in measured),
+        settings.max_mm,
+        settings.max_vertices,
+        settings.max_pairs,
+        settings.neighbor_depth,
+        settings.lock_selection,
+        settings.lock_serial,
+        settings.use_evaluated,
+        settings.clearance_mode,
+        bpy.context.scene.unit_settings.scale_length,  # labels are in scene units
+    )
+
+
+def _classify_depsgraph_updates(depsgraph, measured):
+    """Map measured object names to 'TRANSFORM' or 'GEOMETRY' for this depsgraph event.
+
+    Updates to unrelated IDs (including our own line objects) are ignored.
+    Any update to a measured object's mesh data counts as geometry, since
+    Edit Mode edits and selection changes arrive on the Mesh ID.
+    """
+    by_name = {obj.name: obj for obj in measured}
+    by_mesh = {}
+    for obj in measured:
+        by_mesh.setdefault(obj.data.name, []).append(obj.name)
+
+    changes = {}
+    for update in depsgraph.updates:
+        id_orig = update.id.original
+        if isinstance(id_orig, bpy.types.Object):
+            if id_orig.name not in by_name:
+                continue
+            if update.is_updated_geometry:
+                changes[id_orig.name] = 'GEOMETRY'
+            elif update.is_updated_transform:
+                changes.setdefault(id_orig.name, 'TRANSFORM')
+        elif isinstance(id_orig, bpy.types.Mesh):
+            for name in by_mesh.get(id_orig.name, ()):
+                changes[name] = 'GEOMETRY'
+    return changes
+
+
+def _flush_depsgraph_updates():
+    """Run one recompute for every depsgraph event merged since the last flush."""
+    global _flush_scheduled, _pending_full
+
+    _flush_scheduled = False
+    transform_only = not _pending_full
+    for name, kind in _pending_updates.items():
+        if kind != 'GEOMETRY':
+            continue
+        transform_only = False
+        _geometry_versions[name] = _geometry_versions.get(name, 0) + 1
+        _adjacency_cache.pop(name, None)
+    _pending_updates.clear()
+    _pending_full = False
+
+    distance_update(transform_only, trigger='depsgraph')
+    _remember_positions()
+    return None
+
+
+def _remember_positions():
+    """Record what the last recompute saw, so the timer does not redo it."""
+    global _last_vertex_positions, _last_timer_signature
+
+    settings = getattr(bpy.context.scene, "distance_settings", None)
+    if not settings:
+        return
+    _last_timer_signature = _measurement_signature(settings, _measured_objects(settings))
+    _last_vertex_positions = get_current_vertex_positions()
+
+
+def distance_timer_update():
+    """Adaptive poll: recompute only when the fingerprint changed.
+
+    The interval drops to _TIMER_MIN_INTERVAL as soon as something moves and
+    backs off towards _TIMER_MAX_INTERVAL while the scene stays idle.
+    """
+    global _last_vertex_positions, _last_timer_signature, _timer_interval
+
+    settings = getattr(bpy.context.scene, "distance_settings", None)
+    if not settings:
+        return _TIMER_MAX_INTERVAL
+
+    busy = _poll_background_pairs(settings)
+
+    measured = _measured_objects(settings)
+    signature = _measurement_signature(settings, measured)
+    positions = get_current_vertex_positions()
+
+    if signature != _last_timer_signature or positions_changed(_last_vertex_positions, positions):
+        if signature != _last_timer_signature:
+            _forget_unmeasured(measured)
+        _last_timer_signature = signature
+        _last_vertex_positions = positions
+        distance_update(trigger='timer')
+        _timer_interval = _TIMER_MIN_INTERVAL
+    elif busy:
+        _timer_interval = _TIMER_MIN_INTERVAL  # keep polling until the worker reports back
+    else:
+        _timer_interval = min(_timer_interval * _TIMER_BACKOFF, _TIMER_MAX_INTERVAL)
+
+    return _timer_interval
+
+
+def distance_depsgraph_update(scene, depsgraph):
+    """Queue a recompute only for depsgraph events that touch measured objects."""
+    global _flush_scheduled, _pending_full, _measure_signature
+
+    settings = getattr(scene, "distance_settings", None)
+    if not settings:
+        return
+
+    measured = _measured_objects(settings)
+    signature = _measurement_signature(settings, measured)
+    if signature != _measure_signature:
+        _measure_signature = signature
+        _pending_full = True
+        _forget_unmeasured(measured)
+
+    for name, kind in _classify_depsgraph_updates(depsgraph, measured).items():
+        if _pending_updates.get(name) != 'GEOMETRY':
+            _pending_updates[name] = kind
+
+    if (_pending_full or _pending_updates) and not _flush_scheduled:
+        # Merge bursts of events within one frame into a single recompute
+        bpy.app.timers.register(_flush_depsgraph_updates, first_interval=0.0, persistent=True)
+        _flush_scheduled = True
+
+
+def _can_deform(obj):
+    """Whether a frame change can alter obj's evaluated mesh: modifiers, shape keys or an armature parent."""
+    return bool(obj.modifiers) or obj.data.shape_keys is not None or obj.find_armature() is not None
+
+
+def distance_frame_update(scene, depsgraph=None):
+    """Queue the updates a frame change implies for the measured objects.
+
+    Frame changes fire no depsgraph_update_post. Objects whose measured
+    geometry comes from the evaluated mesh and can deform (see _can_deform)
+    get a geometry update, so their caches drop the previous frame's shape;
+    the rest only get a transform update and keep the cheap re-transform path.
+    """
+    global _flush_scheduled
+
+    settings = getattr(scene, "distance_settings", None)
+    if not settings:
+        return
+
+    evaluated = settings.use_evaluated or _clearance_active(settings)
+    for obj in _measured_objects(settings):
+        if evaluated and obj.mode != 'EDIT' and _can_deform(obj):
+            _pending_updates[obj.name] = 'GEOMETRY'
+        else:
+            _pending_updates.setdefault(obj.name, 'TRANSFORM')
+
+    if _pending_updates and not _flush_scheduled:
+        bpy.app.timers.register(_flush_depsgraph_updates, first_interval=0.0, persistent=True)
+        _flush_scheduled = True
+
+
+def _forget_unmeasured(measured):
+    """Drop per-object geometry caches of objects that left the measured set.
+
+    Their depsgraph events are ignored while they are not measured, so the
+    entries could not be trusted again once they come back.
+    """
+    names = {obj.name for obj in measured}
+    for cache in (_adjacency_cache, _evaluated_cache, _bvh_cache, _sample_cache, _edit_coords_cache):
+        for name in [name for name in cache if name not in names]:
+            del cache[name]
+    for pair in [pair for pair in _overlap_cache if not names.issuperset(pair)]:
+        del _overlap_cache[pair]
+
+
+# ========= GPU draw callback =========
+
+def _publish_pairs(pairs):
+    """Replace _gpu_pairs; returns False (and keeps the version) when nothing changed."""
+    global _gpu_pairs, _pairs_version
+
+    if pairs == _gpu_pairs:
+        return False
+    _gpu_pairs = pairs
+    _pairs_version += 1
+    return True
+
+
+@_profiled("draw_callback_lines")
+def draw_callback_lines():
+    """Draw the distance lines from a batch that is rebuilt only when the pairs change"""
+    global _line_batch
+
+    if not _gpu_pairs:
+        return
+
+    shader = gpu.shader.from_builtin('UNIFORM_COLOR')
+    if _line_batch is None or _line_batch[0] != _pairs_version:
+        batch = batch_for_shader(shader, 'LINES', {"pos": core.pairs_to_line_coords(_gpu_pairs)})
+        _line_batch = (_pairs_version, batch)
+
+    gpu.state.blend_set('ALPHA')
+    gpu.state.line_width_set(1.5)
+    shader.uniform_float("color", (0.5, 0.5, 0.5, 1.0))  # Grey, like the mesh line material
+    _line_batch[1].draw(shader)
+    gpu.state.line_width_set(1.0)
+    gpu.state.blend_set('NONE')
+
+
+def project_to_region(points, perspective_matrix, width, height):
+    """Project (n, 3) world points to region pixels in one array operation.
+
+    Same maths as view3d_utils.location_3d_to_region_2d; returns (xy, in_front)
+    where in_front is False for points behind the view (w <= 0).
+    """
+    persp = np.asarray(perspective_matrix, dtype=np.float64)
+    clip = points @ persp[:, :3].T + persp[:, 3]
+    w = clip[:, 3]
+    in_front = w > 0.0
+    safe_w = np.where(in_front, w, 1.0)
+    xy = np.empty((len(points), 2))
+    xy[:, 0] = (width / 2.0) + (width / 2.0) * clip[:, 0] / safe_w
+    xy[:, 1] = (height / 2.0) + (height / 2.0) * clip[:, 1] / safe_w
+    return xy, in_front
+
+
+@functools.lru_cache(maxsize=1024)
+def _text_width(text, size):
+    """blf width of text at size; labels repeat across redraws so this is cached."""
+    blf.size(FONT_ID, size)
+    return blf.dimensions(FONT_ID, text)[0]
+
+
+_NEIGHBOUR_CELLS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+def declutter_labels(xy, priority, cell_w, cell_h):
+    """Screen-space declutter through a uniform grid spatial hash.
+
+    Labels are cell_w x cell_h rectangles centred on their anchors, visited
+    by ascending priority value; one is kept only if it overlaps no label
+    kept before it. Kept labels never overlap, so each grid cell holds at
+    most one and only the 3x3 cells around a label need checking: linear in
+    label count after the sort. Returns the indices of the kept labels.
+    """
+    cells = np.floor(xy / (cell_w, cell_h)).astype(np.int64).tolist()
+    points = xy.tolist()
+    held = {}  # cell -> anchor of the kept label in it
+    kept = []
+    for i in np.argsort(priority, kind='stable').tolist():
+        (cx, cy), (x, y) = cells[i], points[i]
+        for dx, dy in _NEIGHBOUR_CELLS:
+            other = held.get((cx + dx, cy + dy))
+            if other is not None and abs(other[0] - x) < cell_w and abs(other[1] - y) < cell_h:
+                break
+        else:
+            held[(cx, cy)] = (x, y)
+            kept.append(i)
+    return np.array(kept, dtype=np.int64)
+
+
+def _label_data():
+    """(midpoints, texts) of _gpu_pairs, rebuilt only when _pairs_version moves."""
+    global _label_cache
+
+    if _label_cache is None or _label_cache[0] != _pairs_version:
+        mids = np.array([((va + vb) * 0.5) for va, vb, _dist in _gpu_pairs], dtype=np.float64)
+        texts = [f"{dist_mm:.2f} mm" for _va, _vb, dist_mm in _gpu_pairs]
+        _label_cache = (_pairs_version, mids.reshape(-1, 3), texts)
+    return _label_cache[1], _label_cache[2]
+
+
+@_profiled("draw_callback_gpu")
+def draw_callback_gpu():
+    # Screen-space BLF text with distance-based opacity; lines are drawn by draw_callback_lines
+    global _declutter_culled
+
+    if not _gpu_pairs:
+        return
+
+    region = bpy.context.region
+    rv3d = bpy.context.space_data.region_3d
+    if not region or not rv3d:
+        return
+
+    # Draw GPU screen-space text (BLF) with distance-based opacity
+    text_size = 16  # Like CAD Sketcher text_size
+    margin = text_size / 4  # Same as working test
+
+    # Project every label anchor at once and cull those outside the region
+    mids, texts = _label_data()
+    xy, in_front = project_to_region(mids, rv3d.perspective_matrix, region.width, region.height)
+    pad = text_size * 4  # labels are a few glyphs wide around their anchor
+    visible = (in_front
+               & (xy[:, 0] > -pad) & (xy[:, 0] < region.width + pad)
+               & (xy[:, 1] > -pad) & (xy[:, 1] < region.height + pad))
+    if not visible.any():
+        return
+
+    # Calculate distance-based opacity (stronger when closer)
+    camera_pos = np.array(rv3d.view_matrix.inverted().translation)
+    distance = np.linalg.norm(mids - camera_pos, axis=1) - 1.5
+    alpha = np.maximum(0.2, 1.0 - distance / 5.0)
+
+    shown = np.flatnonzero(visible)
+    culled = 0
+    mode = bpy.context.scene.distance_settings.label_declutter
+    if mode != 'OFF':
+        # _gpu_pairs is sorted by length, so the index doubles as the 'shortest' priority
+        priority = shown if mode == 'SHORTEST' else distance[shown]
+        cell_w = _text_width("000.00 mm", text_size)
+        kept = declutter_labels(xy[shown], priority, cell_w, text_size + margin)
+        culled = len(shown) - len(kept)
+        shown = shown[np.sort(kept)]
+    if culled != _declutter_culled:
+        _declutter_culled = culled
+        _tag_view3d_redraw(force=True, region_types=('UI',))  # the count lives in the sidebar
+
+    blf.size(FONT_ID, text_size)
+
+    for i in shown.tolist():
+        text = texts[i]
+        blf.color(FONT_ID, 1.0, 1.0, 1.0, alpha[i])
+
+        x = xy[i, 0] - _text_width(text, text_size) / 2
+        y = xy[i, 1] + margin
+
+        blf.position(FONT_ID, x, y, 0)
+        blf.draw(FONT_ID, text)
+
+
+# ========= properties =========
+
+class DistanceLockedObject(bpy.types.PropertyGroup):
+    obj: bpy.props.PointerProperty(type=bpy.types.Object)
+
+
+class DistanceSettings(bpy.types.PropertyGroup):
+    max_mm: bpy.props.FloatProperty(
+        name="Max Distance",
+        description="Only pairs with distance <= this value (in scene units)",
+        default=100.0,
+        min=0.01,
+        max=10000.0,
+        soft_min=1.0,
+        soft_max=500.0,
+        step=1.0,
+        precision=2,
+    )
+    max_vertices: bpy.props.IntProperty(
+        name="Max Vertices",
+        description="Maximum vertices sampled from meshes / elements",
+        default=100,
+        min=1,
+        max=100000,
+        soft_min=10,
+        soft_max=500,
+    )
+    max_pairs: bpy.props.IntProperty(
+        name="Max Pairs",
+        description="Maximum pairs to display (after neighbor expansion)",
+        default=10,
+        min=1,
+        max=10000,
+        soft_min=1,
+        soft_max=500,
+    )
+    neighbor_depth: bpy.props.IntProperty(
+        name="Adjacency Steps (Edit)",
+        description="In Edit Mode, show distances along edges up to this many steps from each selected vertex",
+        default=1,
+        min=0,
+        max=5,
+    )
+    use_mesh_lines: bpy.props.BoolProperty(
+        name="Mesh Lines",
+        description="Also write the lines into a WD_Lines scene object (GPU lines are always drawn)",
+        default=False,
+    )
+    label_declutter: bpy.props.EnumProperty(
+        name="Declutter Labels",
+        description="Hide overlapping labels, preferring the shorter or nearer one",
+        items=(
+            ('OFF', "Off", "Draw every label"),
+            ('SHORTEST', "Shortest", "Prefer shorter distances where labels overlap"),
+            ('NEAREST', "Nearest", "Prefer labels closer to the camera where labels overlap"),
+        ),
+        default='OFF',
+    )
+    clearance_mode: bpy.props.BoolProperty(
+        name="Object Clearance",
+        description="In Object Mode, show the minimum surface-to-surface distance between each two "
+                    "selected objects instead of vertex pairs",
+        default=False,
+    )
+    use_evaluated: bpy.props.BoolProperty(
+        name="Measure Evaluated",
+        description="In Object Mode, measure the mesh after modifiers (mirror, array, solidify...). "
+                    "Edit Mode and locked selections always use the original vertices",
+        default=False,
+    )
+    background_compute: bpy.props.BoolProperty(
+        name="Background Search",
+        description="Run the pair search on a worker thread so large vertex counts do not block the viewport",
+        default=False,
+    )
+    spacing_tolerance: bpy.props.FloatProperty(
+        name="Spacing Tolerance",
+        description="Spacing analysis counts pairs at or below this distance (in scene units)",
+        default=1.0,
+        min=0.0,
+        soft_max=100.0,
+        precision=3,
+    )
+    lock_selection: bpy.props.BoolProperty(
+        name="Lock Selection",
+        description="Use stored vertices instead of current selection",
+        default=False,
+    )
+    locked_objects: bpy.props.CollectionProperty(
+        name="Locked Objects",
+        description="Objects whose locked vertex indices are stored on the object itself",
+        type=DistanceLockedObject,
+    )
+    lock_serial: bpy.props.IntProperty(
+        name="Lock Serial",
+        description="Bumped on every lock so cached locked indices are decoded again",
+        default=0,
+        options={'HIDDEN'},
+    )
+    locked_sets_json: bpy.props.StringProperty(
+        name="Locked Sets JSON",
+        description="Serialized list of locked selections per object (legacy, read for migration)",
+        default="[]",
+    )
+    locked_count: bpy.props.IntProperty(
+        name="Locked Count",
+        description="Total number of locked vertices across all objects",
+        default=0,
+        min=0,
+    )
+    profiling: bpy.props.BoolProperty(
+        name="Profiling",
+        description="Time every update and draw stage (p50 / p95 / max over recent calls)",
+        default=False,
+        update=_profiling_update,
+    )
+
+
+# ========= lock operator =========
+
+class VIEW3D_OT_lock_world_distances(bpy.types.Operator):
+    bl_idname = "view3d.lock_world_distances_selection"
+    bl_label = "Lock Current Selection"
+    bl_description = "Store current Edit Mode vertex selections (across all edited meshes) as the locked set"
+
+    def execute(self, context):
+        scene = context.scene
+        settings = scene.distance_settings
+
+        active = context.view_layer.objects.active
+        if not active or active.type != 'MESH' or active.mode != 'EDIT':
+            self.report({'WARNING'}, "At least one mesh in Edit Mode required to lock selection")
+            return {'CANCELLED'}
+
+        locked_sets = []
+
+        for obj in context.selected_objects:
+            if obj.type != 'MESH' or obj.mode != 'EDIT':
+                continue
+
+            bm = bmesh.from_edit_mesh(obj.data)
+            bm.verts.index_update()
+            indices = [v.index for v in bm.verts if v.select]
+
+            if indices:
+                locked_sets.append((obj, indices))
+
+        if not locked_sets:
+            self.report({'WARNING'}, "No selected vertices on any edited mesh to lock")
+            return {'CANCELLED'}
+
+        total_verts = _store_locked_sets(settings, locked_sets)
+        settings.lock_selection = True
+
+        self.report({'INFO'}, f"Locked {total_verts} vertices on {len(locked_sets)} object(s)")
+        return {'FINISHED'}
+
+
+# ========= export operator =========
+
+_EXPORT_FIELDS = ("obj_a", "vert_a", "ax", "ay", "az", "obj_b", "vert_b", "bx", "by", "bz", "distance")
+_EXPORT_CHUNK_PAIRS = 4096    # rows per written chunk
+_EXPORT_SLICE_SECONDS = 0.05  # time spent writing per modal tick, keeps the UI responsive
+
+
+def _export_rows(pairs, slot_names):
+    """Turn candidate pairs into flat rows matching _EXPORT_FIELDS."""
+    for a, b, dist, key_a, key_b in pairs:
+        slot_a, idx_a = int(key_a) >> 32, int(key_a) & 0xFFFFFFFF
+        slot_b, idx_b = int(key_b) >> 32, int(key_b) & 0xFFFFFFFF
+        yield (slot_names[slot_a], idx_a, *map(float, a),
+               slot_names[slot_b], idx_b, *map(float, b), float(dist))
+
+
+def iter_export_chunks(rows, file_format, chunk_pairs=_EXPORT_CHUNK_PAIRS):
+    """Yield (text, row count) chunks of CSV or JSON Lines output.
+
+    Only one chunk is ever held in memory, whatever the number of rows.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n") if file_format == 'CSV' else None
+    if writer:
+        writer.writerow(_EXPORT_FIELDS)
+
+    count = 0
+    for row in rows:
+        if writer:
+            writer.writerow(row)
+        else:
+            buf.write(json.dumps(dict(zip(_EXPORT_FIELDS, row))))
+            buf.write("\n")
+        count += 1
+        if count == chunk_pairs:
+            yield buf.getvalue(), count
+            buf.seek(0)
+            buf.truncate()
+            count = 0
+
+    if buf.tell():
+        yield buf.getvalue(), count
+
+
+class VIEW3D_OT_export_world_distances(bpy.types.Operator, ExportHelper):
+    bl_idname = "view3d.export_world_distances"
+    bl_label = "Export Distances"
+    bl_description = "Stream every pair within Max Distance to a CSV or JSON Lines file"
+
+    filename_ext = ".csv"
+    filter_glob: bpy.props.StringProperty(default="*.csv;*.jsonl", options={'HIDDEN'})
+    file_format: bpy.props.EnumProperty(
+        name="Format",
+        items=(
+            ('CSV', "CSV", "Comma separated values with a header row"),
+            ('JSONL', "JSON Lines", "One JSON object per pair"),
+        ),
+        default='CSV',
+    )
+
+    def check(self, context):
+        self.filename_ext = ".csv" if self.file_format == 'CSV' else ".jsonl"
+        return super().check(context)
+
+    def execute(self, context):
+        settings = context.scene.distance_settings
+
+        # Every measured vertex, not the Max Vertices sample the overlay draws
+        measured = _collect_measured_vertices(_ALL_VERTICES, _active_locked_sets(settings))
+        if not len(measured[0]):
+            self.report({'WARNING'}, "Nothing to export: no measured vertices")
+            return {'CANCELLED'}
+
+        pairs = _iter_candidate_pairs(measured, settings.max_mm, settings.neighbor_depth)
+        self._chunks = iter_export_chunks(_export_rows(pairs, measured[3]), self.file_format)
+        self._written = 0
+        self._file = open(self.filepath, "w", newline="", encoding="utf-8")
+
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.01, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self._finish(context)
+            self.report({'WARNING'}, f"Export cancelled after {self._written} pairs")
+            return {'CANCELLED'}
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        deadline = time.perf_counter() + _EXPORT_SLICE_SECONDS
+        try:
+            for text, count in self._chunks:
+                self._file.write(text)
+                self._written += count
+                if time.perf_counter() > deadline:
+                    return {'RUNNING_MODAL'}
+        except Exception as exc:
+            self._finish(context)
+            self.report({'ERROR'}, f"Export failed after {self._written} pairs: {exc}")
+            return {'CANCELLED'}
+
+        self._finish(context)
+        self.report({'INFO'}, f"Exported {self._written} pairs to {self.filepath}")
+        return {'FINISHED'}
+
+    def _finish(self, context):
+        context.window_manager.event_timer_remove(self._timer)
+        self._file.close()
+
+
+# ========= spacing analysis operator =========
+
+class VIEW3D_OT_analyze_world_distances(bpy.types.Operator):
+    bl_idname = "view3d.analyze_world_distances"
+    bl_label = "Analyze Spacing"
+    bl_description = "Compute spacing statistics over all pairs of measured vertices, in fixed-size tiles"
+
+    _WINDOW_PER_WORKER = 2  # tiles in flight per worker; bounds memory at any selection size
+
+    def execute(self, context):
+        global _spacing_stats
+
+        settings = context.scene.distance_settings
+        coords, _keys, _per_obj, _slots = _collect_measured_vertices(
+            _ALL_VERTICES, _active_locked_sets(settings))
+        if len(coords) < 2:
+            self.report({'WARNING'}, "Spacing analysis needs at least two measured vertices")
+            return {'CANCELLED'}
+
+        n = len(coords)
+        n_tiles = (n + core.STATS_TILE - 1) // core.STATS_TILE
+        self._total = n_tiles * (n_tiles + 1) // 2
+        self._done = 0
+        self._tiles = core.iter_tiles(n)
+        self._args = (coords, settings.max_mm, settings.spacing_tolerance,
+                      context.scene.unit_settings.scale_length)
+        self._acc = None
+        self._pending = set()
+        workers = os.cpu_count() or 2
+        self._window = workers * self._WINDOW_PER_WORKER
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="WorldDistancesStats")
+
+        _spacing_stats = {"progress": 0.0, "vertices": n}
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.05, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        global _spacing_stats
+
+        if event.type == 'ESC':
+            self._finish(context)
+            _spacing_stats = None
+            self.report({'WARNING'}, "Spacing analysis cancelled")
+            return {'CANCELLED'}
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        done = {f for f in self._pending if f.done()}
+        self._pending -= done
+        try:
+            for future in done:
+                self._acc = core.merge_stats(self._acc, future.result())
+        except Exception as exc:
+            self._finish(context)
+            _spacing_stats = None
+            self.report({'ERROR'}, f"Spacing analysis failed: {exc}")
+            return {'CANCELLED'}
+        self._done += len(done)
+
+        # Top up the bounded window of tiles in flight
+        for i0, j0 in itertools.islice(self._tiles, self._window - len(self._pending)):
+            self._pending.add(self._executor.submit(core.tile_stats, self._args[0], i0, j0, *self._args[1:]))
+
+        _spacing_stats["progress"] = self._done / self._total
+        _tag_view3d_redraw(force=True, region_types=('UI',))  # progress lives in the sidebar
+        if self._pending:
+            return {'RUNNING_MODAL'}
+
+        self._finish(context)
+        _spacing_stats = dict(self._acc, vertices=len(self._args[0]), hist_max=self._args[1],
+                              tolerance=self._args[2], progress=1.0)
+        _tag_view3d_redraw(force=True, region_types=('UI',))
+        self.report({'INFO'}, f"Analyzed {self._acc['count']} pairs")
+        return {'FINISHED'}
+
+    def _finish(self, context):
+        context.window_manager.event_timer_remove(self._timer)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ========= profiling operators =========
+
+class VIEW3D_OT_dump_distance_profile(bpy.types.Operator, ExportHelper):
+    bl_idname = "view3d.dump_distance_profile"
+    bl_label = "Dump Profile"
+    bl_description = "Write the per-stage timing statistics to a JSON file"
+
+    filename_ext = ".json"
+    filter_glob: bpy.props.StringProperty(default="*.json", options={'HIDDEN'})
+
+    def execute(self, context):
+        with open(self.filepath, "w", encoding="utf-8") as f:
+            json.dump(_profile_report(), f, indent=2)
+        self.report({'INFO'}, f"Wrote {len(_profile_stats)} stages to {self.filepath}")
+        return {'FINISHED'}
+
+
+class VIEW3D_OT_reset_distance_profile(bpy.types.Operator):
+    bl_idname = "view3d.reset_distance_profile"
+    bl_label = "Reset Profile"
+    bl_description = "Clear the per-stage timing statistics"
+
+    def execute(self, context):
+        _profile_stats.clear()
+        return {'FINISHED'}
+
+
+# ========= toggle operator =========
+
+class VIEW3D_OT_toggle_world_distances(bpy.types.Operator):
+    bl_idname = "view3d.toggle_world_distances_text_gpu"
+    bl_label = "Realtime Distances On / Off"
+    bl_description = "Toggle realtime distances using GPU lines + CAD Sketcher inspired screen-space text"
+
+    running: bpy.props.BoolProperty(default=False)
+
+    def execute(self, context):
+        global _draw_handler, _line_draw_handler, _handler_registered, _profiling
+
+        scene = context.scene
+        settings = scene.distance_settings
+
+        if self.running:
+            distance_overlay_global_clear()
+            self.running = False
+            return {'FINISHED'}
+
+        distance_overlay_global_clear()
+        _profiling = settings.profiling  # the property may come from a saved file
+
+        start = time.perf_counter_ns() if _profiling else 0
+        if _clearance_active(settings):
+            _publish_pairs([(a, b, d) for a, b, d, _key in _clearance_pairs(settings)[0]])
+        elif settings.background_compute:
+            # The update timer publishes the result; remembering the positions
+            # keeps its first tick from queueing the same search again
+            _submit_snapshot(settings, _measurement_signature(settings, _measured_objects(settings)))
+            _remember_positions()
+        else:
+            _publish_pairs(collect_vertex_pairs(
+                settings.max_mm,
+                settings.max_vertices,
+                settings.max_pairs,
+                settings.neighbor_depth,
+                _active_locked_sets(settings),
+            ))
+        if start:
+            _profile_record("distance_update (operator)", start)
+        if not _gpu_pairs and _bg_future is None:
+            self.report(
+                {'WARNING'},
+                "No distance pairs found. Check: mesh selection, vertex selection in Edit mode, locked selection, or increase 'Max Distance' threshold."
+            )
+            return {'CANCELLED'}
+
+        # The position cache starts empty, so the first timer tick builds the lines
+
+        if _draw_handler is None:
+            _draw_handler = bpy.types.SpaceView3D.draw_handler_add(
+                draw_callback_gpu, (), 'WINDOW', 'POST_PIXEL'
+            )
+
+        if _line_draw_handler is None:
+            _line_draw_handler = bpy.types.SpaceView3D.draw_handler_add(
+                draw_callback_lines, (), 'WINDOW', 'POST_VIEW'
+            )
+
+        if settings.use_mesh_lines:
+            update_mesh_lines()
+        _tag_view3d_redraw()
+
+        if not _handler_registered:
+            bpy.app.handlers.depsgraph_update_post.append(distance_depsgraph_update)
+            bpy.app.handlers.frame_change_post.append(distance_frame_update)
+            _handler_registered = True
+
+        # Start frequent update timer for real-time feedback
+        global _update_timer, _timer_interval
+        if _update_timer is None:
+            _timer_interval = _TIMER_MIN_INTERVAL
+            bpy.app.timers.register(distance_timer_update, first_interval=_timer_interval, persistent=True)
+            _update_timer = distance_timer_update
+
+        self.running = True
+        return {'FINISHED'}
+
+
+# ========= panel =========
+
+class VIEW3D_PT_world_distances(bpy.types.Panel):
+    bl_label = "World Distances"
+    bl_idname = "VIEW3D_PT_world_distances"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = "Blender Vertex Measurments"
+
+    def draw(self, context):
+        layout = self.layout
+        settings = context.scene.distance_settings
+
+        layout.prop(settings, "max_mm")
+        layout.prop(settings, "max_vertices")
+        layout.prop(settings, "max_pairs")
+        layout.prop(settings, "neighbor_depth")
+        layout.prop(settings, "use_mesh_lines")
+        layout.prop(settings, "use_evaluated")
+        layout.prop(settings, "clearance_mode")
+        layout.prop(settings, "label_declutter")
+        layout.prop(settings, "background_compute")
+        if settings.label_declutter != 'OFF':
+            layout.label(text=f"Decluttered labels: {_declutter_culled}")
+
+        row = layout.row(align=True)
+        row.prop(settings, "lock_selection", text="Lock Selection")
+        row.operator("view3d.lock_world_distances_selection", text="", icon='PINNED')
+
+        if settings.lock_selection:
+            layout.label(text=f"Locked verts: {settings.locked_count}")
+
+        layout.label(text="GPU screen-space text (CAD Sketcher style)")
+        layout.operator("view3d.toggle_world_distances_text_gpu", icon='FONT_DATA')
+        layout.operator("view3d.export_world_distances", icon='EXPORT')
+
+        box = layout.box()
+        box.label(text="Spacing Analysis (all pairs)")
+        box.prop(settings, "spacing_tolerance")
+        box.operator("view3d.analyze_world_distances", icon='SORTSIZE')
+        stats = _spacing_stats
+        if stats and stats["progress"] < 1.0:
+            box.label(text=f"Analyzing {stats['vertices']} verts: {stats['progress'] * 100:.0f}%")
+        elif stats:
+            box.label(text=f"Pairs: {stats['count']}  Verts: {stats['vertices']}")
+            box.label(text=f"Min: {stats['min']:.3f}  Max: {stats['max']:.3f}")
+            box.label(text=f"Mean: {stats['sum'] / stats['count']:.3f}")
+            box.label(text=f"<= {stats['tolerance']:.3f}: {stats['under']}")
+            col = box.column(align=True)
+            width = stats["hist_max"] / len(stats["hist"])
+            for k, count in enumerate(stats["hist"].tolist()):
+                if count:
+                    col.label(text=f"{k * width:.2f} - {(k + 1) * width:.2f}: {count}")
+            if stats["overflow"]:
+                col.label(text=f"> {stats['hist_max']:.2f}: {stats['overflow']}")
+
+        header, body = layout.panel("VIEW3D_PT_world_distances_profiling", default_closed=True)
+        header.prop(settings, "profiling")
+        if body:
+            for stage, stage_stats in sorted(_profile_stats.items()):
+                summary = stage_stats.summary()
+                col = body.column(align=True)
+                col.label(text=stage)
+                col.label(text=f"  p50 {summary['p50_ms']:.2f}  p95 {summary['p95_ms']:.2f}  "
+                               f"max {summary['max_ms']:.2f} ms  x{summary['count']}")
+            if not _profile_stats:
+                body.label(text="No samples yet" if settings.profiling else "Profiling is off")
+            row = body.row(align=True)
+            row.operator("view3d.dump_distance_profile", icon='FILE_TEXT')
+            row.operator("view3d.reset_distance_profile", icon='X')
+
+
+# ========= register =========
+
+classes = (
+    DistanceLockedObject,
+    DistanceSettings,
+    VIEW3D_OT_lock_world_distances,
+    VIEW3D_OT_toggle_world_distances,
+    VIEW3D_OT_export_world_distances,
+    VIEW3D_OT_analyze_world_distances,
+    VIEW3D_OT_dump_distance_profile,
+    VIEW3D_OT_reset_distance_profile,
+    VIEW3D_PT_world_distances,
+)
+
+def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+    bpy.types.Scene.distance_settings = bpy.props.PointerProperty(type=DistanceSettings)
+    bpy.app.handlers.load_post.append(_migrate_locked_sets)
+    bpy.app.handlers.load_pre.append(_clear_on_load)
+
+def unregister():
+    if _migrate_locked_sets in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_migrate_locked_sets)
+    if _clear_on_load in bpy.app.handlers.load_pre:
+        bpy.app.handlers.load_pre.remove(_clear_on_load)
+    if hasattr(bpy.types.Scene, "distance_settings"):
+        del bpy.types.Scene.distance_settings
+    distance_overlay_global_clear()
+    for cls in reversed(classes):
+        bpy.utils.unregister_class(cls)
+
+if __name__ == "__main__":
+    register()
@@ -0,0 +1,532 @@
+"""Blender-independent core of the World Distances measurements.
+
+Pair search, adjacency expansion, top-k dedupe, representative sampling and
+spacing statistics over plain NumPy arrays. The add-on feeds it world-space
+coordinates read from bpy; measure_batch.py feeds it vertices read from mesh
+files. Only NumPy is imported here, so the module loads without Blender.
+Inside Blender the radius search uses mathutils.kdtree, elsewhere scipy's
+cKDTree when installed, else a NumPy grid hash.
+"""
+
+import heapq
+
+import numpy as np
+
+try:
+    from mathutils.kdtree import KDTree
+except ImportError:  # outside Blender
+    KDTree = None
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+# ========= coordinates and identities =========
+
+def to_world(co, matrix_world):
+    """Apply a 4x4 matrix to an (n, 3) array of local coordinates in one multiply."""
+    mat = np.array(matrix_world, dtype=np.float32)
+    return co @ mat[:3, :3].T + mat[:3, 3]
+
+
+def vertex_keys(slot, indices):
+    """Pack (object slot, vertex index) into one int64 identity per vertex."""
+    return (np.int64(slot) << 32) | np.asarray(indices, dtype=np.int64)
+
+
+def pair_key(key_a, key_b):
+    """Pack two vertex identities, smallest first, into one dedupe key."""
+    if key_a > key_b:
+        key_a, key_b = key_b, key_a
+    return (int(key_a) << 64) | int(key_b)
+
+
+def split_pair_key(key):
+    """Inverse of pair_key: ((slot, index), (slot, index)) of both endpoints."""
+    key_a, key_b = key >> 64, key & 0xFFFFFFFFFFFFFFFF
+    return (key_a >> 32, key_a & 0xFFFFFFFF), (key_b >> 32, key_b & 0xFFFFFFFF)
+
+
+# ========= adjacency graph =========
+
+def build_csr(n_verts, edges):
+    """Compressed sparse row adjacency (indptr, indices) from an (m, 2) edge array."""
+    src = np.concatenate((edges[:, 0], edges[:, 1]))
+    dst = np.concatenate((edges[:, 1], edges[:, 0]))
+    indices = dst[np.argsort(src, kind='stable')]
+    indptr = np.zeros(n_verts + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n_verts), out=indptr[1:])
+    return indptr, indices
+
+
+def expand_neighbourhoods(indptr, indices, sources, depth):
+    """Multi-source BFS over a CSR graph, all sources advanced together.
+
+    Returns (owner, reached): for every vertex within depth edge steps of
+    sources[owner] (the source itself excluded), one entry in each array.
+    """
+    n = len(indptr) - 1
+    owner = np.arange(len(sources), dtype=np.int64)
+    frontier = np.asarray(sources, dtype=np.int64)
+    visited = np.unique(owner * n + frontier)  # (owner, vertex) packed as owner * n + vertex
+    out_owner, out_reached = [], []
+
+    for _step in range(depth):
+        degree = indptr[frontier + 1] - indptr[frontier]
+        total = int(degree.sum())
+        if not total:
+            break
+        # Gather every neighbour of every frontier vertex in one go
+        offsets = np.arange(total) - np.repeat(np.cumsum(degree) - degree, degree)
+        nbr = indices[np.repeat(indptr[frontier], degree) + offsets]
+        packed = np.unique(np.repeat(owner, degree) * n + nbr)
+        packed = packed[~np.isin(packed, visited, assume_unique=True)]
+        if not len(packed):
+            break
+        visited = np.union1d(visited, packed)
+        owner, frontier = packed // n, packed % n
+        out_owner.append(owner)
+        out_reached.append(frontier)
+
+    if not out_owner:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(out_owner), np.concatenate(out_reached)
+
+
+def adjacency_candidates(indptr, indices, src_idx, src_world, lookup_world, depth, max_dist,
+                         scale_length=1.0, slot=0):
+    """Adjacency pairs within max_dist of the sources, sorted by distance.
+
+    lookup_world(unique_indices) returns the (m, 3) world coordinates of the
+    reached vertices. Returns (a, b, dist, key_a, key_b) arrays; pairs between
+    two sources are left out, the global search already produces them.
+    """
+    owner, reached = expand_neighbourhoods(indptr, indices, src_idx, depth)
+    fresh = ~np.isin(reached, src_idx)
+    owner, reached = owner[fresh], reached[fresh]
+
+    uniq, inverse = np.unique(reached, return_inverse=True)
+    world = np.asarray(lookup_world(uniq)).reshape(-1, 3)[inverse]
+
+    dist = np.linalg.norm(world - src_world[owner], axis=1) / scale_length
+    order = np.argsort(dist)
+    order = order[:np.searchsorted(dist[order], max_dist, side='right')]
+    base = np.int64(slot) << 32
+    owner = owner[order]
+    return (src_world[owner], world[order], dist[order],
+            base | src_idx[owner], base | reached[order])
+
+
+def iter_sorted_candidates(candidates, bound=None):
+    """Yield rows of sorted candidate arrays until bound() can no longer be beaten."""
+    a, b, dist, key_a, key_b = candidates
+    for k, d in enumerate(dist.tolist()):
+        if bound is not None and d >= bound():
+            break
+        yield a[k], b[k], d, int(key_a[k]), int(key_b[k])
+
+
+# ========= representative sampling =========
+
+_SAMPLE_ROUNDS = 6  # grid size refinements before settling for an even stride
+
+
+def _occupied_cells(pts, lo, size):
+    """Per point cell id and the number of distinct cells of a grid of the given size."""
+    cell = np.floor((pts - lo) / size).astype(np.int64)
+    dims = cell.max(axis=0) + 1
+    lin = (cell[:, 0] * dims[1] + cell[:, 1]) * dims[2] + cell[:, 2]
+    return lin, len(np.unique(lin))
+
+
+def voxel_sample(coords, budget):
+    """Indices of at most budget vertices spread evenly over coords.
+
+    Snaps the points to a voxel grid sized so that about budget cells are
+    occupied and keeps the vertex nearest the centre of each occupied cell,
+    so the sample covers the whole shape whatever the vertex order. A few
+    vectorized passes over the points, no per-vertex Python work.
+    """
+    pts = np.asarray(coords, dtype=np.float64)
+    n = len(pts)
+    if n <= budget:
+        return np.arange(n)
+    if budget <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    lo = pts.min(axis=0)
+    extent = pts.max(axis=0) - lo
+    spanned = extent[extent > 0.0]
+    if not len(spanned):
+        return np.arange(budget)  # all points coincide
+    # First guess assumes the points fill their bounding box
+    size = float(np.prod(spanned) / budget) ** (1.0 / len(spanned))
+
+    best = None  # (size, lin, occupied) of the finest grid within budget
+    for _round in range(_SAMPLE_ROUNDS):
+        lin, occupied = _occupied_cells(pts, lo, size)
+        if occupied <= budget and (best is None or occupied > best[2]):
+            best = (size, lin, occupied)
+        if 0.8 * budget <= occupied <= budget:
+            break
+        # Surfaces fill cells with the square of the resolution
+        size *= (occupied / budget) ** 0.5
+    if best is None:
+        best = (size, lin, occupied)
+    size, lin, _occupied = best
+
+    centre = lo + (np.floor((pts - lo) / size) + 0.5) * size
+    offset = np.einsum('ij,ij->i', pts - centre, pts - centre)
+    order = np.lexsort((offset, lin))
+    first = np.ones(n, dtype=bool)
+    first[1:] = lin[order][1:] != lin[order][:-1]
+    chosen = order[first]  # grouped by cell id, so nearby cells stay together
+    if len(chosen) > budget:
+        chosen = chosen[np.linspace(0, len(chosen) - 1, budget).astype(np.int64)]
+    return np.sort(chosen)
+
+
+def split_budget(counts, weights, budget):
+    """Share budget among point sets of the given sizes, in proportion to weights.
+
+    No set gets more than it holds; what a capped set cannot use goes to
+    the others, so the shares add up to min(budget, sum(counts)).
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    weights = np.maximum(np.asarray(weights, dtype=np.float64), 0.0)
+    if counts.sum() <= budget:
+        return counts.copy()
+
+    shares = np.zeros(len(counts), dtype=np.int64)
+    left = int(budget)
+    while left > 0:
+        room = shares < counts
+        w = np.where(room, weights, 0.0)
+        if w.sum() <= 0.0:
+            w = room.astype(np.float64)
+        grant = np.minimum(np.floor(w / w.sum() * left).astype(np.int64), counts - shares)
+        if not grant.any():
+            # Fewer points left than open sets can split: one each, heaviest first
+            open_sets = np.flatnonzero(room)
+            shares[open_sets[np.argsort(-w[open_sets], kind='stable')][:left]] += 1
+            break
+        shares += grant
+        left -= int(grant.sum())
+    return shares
+
+
+# ========= radius search =========
+
+# Neighbour cells visited from each grid cell: itself plus half of the 26
+# around it, so every pair of adjacent cells is joined exactly once.
+_HALF_OFFSETS = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+                 if (dx, dy, dz) >= (0, 0, 0)]
+_ALL_OFFSETS = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)]
+
+
+def _grid_cells(pts, radius):
+    """Packed radius-sized cell id of every point, and the stride that packs (dx, dy, dz) offsets."""
+    cell = np.floor(pts / radius).astype(np.int64)
+    # Rank-compress each axis: touching cells stay one apart, the packed cell
+    # id below stays within int64, and skipped empty rows only add candidates
+    # that the distance test drops.
+    cell = np.column_stack([np.unique(cell[:, k], return_inverse=True)[1].ravel() + 1 for k in range(3)])
+    dims = cell.max(axis=0) + 2
+    stride = np.array([dims[1] * dims[2], dims[2], 1], dtype=np.int64)
+    return cell @ stride, stride
+
+
+def _cell_matches(target, order, sorted_lin):
+    """(i, j): every point j whose cell id is target[i], with order / sorted_lin from argsort."""
+    lo = np.searchsorted(sorted_lin, target, side='left')
+    count = np.searchsorted(sorted_lin, target, side='right') - lo
+    total = int(count.sum())
+    i = np.repeat(np.arange(len(target)), count)
+    j = order[np.repeat(lo, count) + np.arange(total) - np.repeat(np.cumsum(count) - count, count)]
+    return i, j
+
+
+def _grid_radius_pairs(coords, radius):
+    """radius_pair_arrays without a KD-tree: bucket into radius-sized cells, join neighbour cells."""
+    pts = np.asarray(coords, dtype=np.float64)
+    lin, stride = _grid_cells(pts, radius)
+    order = np.argsort(lin, kind='stable')
+    sorted_lin = lin[order]
+
+    out_i, out_j, out_d = [], [], []
+    for offset in _HALF_OFFSETS:
+        i, j = _cell_matches(lin + int(np.dot(offset, stride)), order, sorted_lin)
+        if not len(i):
+            continue
+        if offset == (0, 0, 0):
+            keep = i < j
+            i, j = i[keep], j[keep]
+        d = np.linalg.norm(pts[i] - pts[j], axis=1)
+        keep = d <= radius
+        out_i.append(i[keep])
+        out_j.append(j[keep])
+        out_d.append(d[keep])
+
+    if not out_i:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    i, j = np.concatenate(out_i), np.concatenate(out_j)
+    return np.minimum(i, j), np.maximum(i, j), np.concatenate(out_d)
+
+
+def radius_pair_arrays(coords, radius):
+    """Every pair i < j closer than radius, as (i, j, dist) arrays, without mathutils."""
+    if len(coords) < 2 or radius <= 0.0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    if cKDTree is not None:
+        pts = np.asarray(coords, dtype=np.float64)
+        ij = cKDTree(pts).query_pairs(radius, output_type='ndarray').astype(np.int64)
+        return ij[:, 0], ij[:, 1], np.linalg.norm(pts[ij[:, 0]] - pts[ij[:, 1]], axis=1)
+    return _grid_radius_pairs(coords, radius)
+
+
+def _grid_cross_pairs(a, b, radius):
+    """cross_radius_pair_arrays without a KD-tree: bucket both sets together, probe b's cells from a."""
+    pts_a = np.asarray(a, dtype=np.float64)
+    pts_b = np.asarray(b, dtype=np.float64)
+    lin, stride = _grid_cells(np.concatenate((pts_a, pts_b)), radius)
+    lin_a, lin_b = lin[:len(pts_a)], lin[len(pts_a):]
+    order = np.argsort(lin_b, kind='stable')
+    sorted_lin = lin_b[order]
+
+    out_i, out_j, out_d = [], [], []
+    for offset in _ALL_OFFSETS:
+        i, j = _cell_matches(lin_a + int(np.dot(offset, stride)), order, sorted_lin)
+        if not len(i):
+            continue
+        d = np.linalg.norm(pts_a[i] - pts_b[j], axis=1)
+        keep = d <= radius
+        out_i.append(i[keep])
+        out_j.append(j[keep])
+        out_d.append(d[keep])
+
+    if not out_i:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    return np.concatenate(out_i), np.concatenate(out_j), np.concatenate(out_d)
+
+
+def cross_radius_pair_arrays(a, b, radius):
+    """Every (i, j) with |a[i] - b[j]| <= radius, as (i, j, dist) arrays; i indexes a, j indexes b."""
+    if not len(a) or not len(b) or radius <= 0.0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    if cKDTree is not None:
+        found = cKDTree(np.asarray(a, dtype=np.float64)).sparse_distance_matrix(
+            cKDTree(np.asarray(b, dtype=np.float64)), radius, output_type='ndarray')
+        return found['i'].astype(np.int64), found['j'].astype(np.int64), found['v']
+    return _grid_cross_pairs(a, b, radius)
+
+
+def radius_pairs(coords, radius, shrink=None):
+    """Yield (i, j, dist) for every i < j with |coords[i] - coords[j]| <= radius.
+
+    With mathutils, builds a KD-tree once and only visits neighbours inside
+    the radius, so the cost is O(n log n + k). If given, shrink() returns the
+    current radius ceiling and is re-read before each query, letting a
+    bounded selector tighten the search as it fills up. Without mathutils the
+    pairs come from radius_pair_arrays and shrink is not needed.
+    """
+    if KDTree is None:
+        i, j, d = radius_pair_arrays(coords, radius)
+        yield from zip(i.tolist(), j.tolist(), d.tolist())
+        return
+
+    verts = np.asarray(coords).tolist()
+    tree = KDTree(len(verts))
+    for i, co in enumerate(verts):
+        tree.insert(co, i)
+    tree.balance()
+
+    for i, co in enumerate(verts):
+        r = radius if shrink is None else min(radius, shrink())
+        for _co, j, dist in tree.find_range(co, r):
+            if j > i:
+                yield i, j, dist
+
+
+def iter_global_pairs(coords, keys, max_dist, scale_length=1.0, bound=None):
+    """Radius pairs over world coords, as (a, b, dist, key_a, key_b), distances in scene units."""
+    if len(coords) < 2:
+        return
+    radius = max_dist * scale_length
+    shrink = None if bound is None else (lambda: bound() * scale_length)
+    for i, j, d in radius_pairs(coords, radius, shrink):
+        yield coords[i], coords[j], d / scale_length, keys[i], keys[j]
+
+
+# ========= top-k selection =========
+
+class TopPairs:
+    """Streaming selector that keeps only the k shortest distinct pairs.
+
+    Candidates go into a bounded max-heap, so memory stays O(k) and each push
+    costs O(log k) no matter how many candidates the search produces.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self._heap = []  # (-dist, seq, key, a, b); root is the worst pair held
+        self._keys = set()
+        self._seq = 0
+
+    def bound(self):
+        """Distance a new pair must beat, or inf while fewer than k are held."""
+        if len(self._heap) < self.k:
+            return float("inf")
+        return -self._heap[0][0]
+
+    def push(self, a, b, dist, key_a, key_b):
+        if dist >= self.bound():
+            return
+        if key_a > key_b:
+            a, b = b, a  # keep a matching the high half of the pair key
+        key = pair_key(key_a, key_b)
+        if key in self._keys:
+            return
+        self._seq += 1
+        self._keys.add(key)
+        heapq.heappush(self._heap, (-dist, self._seq, key, a, b))
+        if len(self._heap) > self.k:
+            dropped = heapq.heappop(self._heap)
+            self._keys.discard(dropped[2])
+
+    def result(self):
+        """Held pairs as [(a, b, dist, pair_key(a, b)), ...] sorted by ascending distance."""
+        return [(a, b, -neg, key) for neg, _seq, key, a, b in sorted(self._heap, reverse=True)]
+
+
+def top_pairs(coords, keys, max_dist, max_pairs, scale_length=1.0, adjacency=()):
+    """The max_pairs shortest distinct pairs within max_dist.
+
+    Draws from the global radius search over coords and from each set of
+    adjacency_candidates, all feeding one TopPairs.
+    """
+    top = TopPairs(max_pairs)
+    for a, b, d, key_a, key_b in iter_global_pairs(coords, keys, max_dist, scale_length, top.bound):
+        top.push(a, b, d, key_a, key_b)
+    for candidates in adjacency:
+        for a, b, d, key_a, key_b in iter_sorted_candidates(candidates, top.bound):
+            top.push(a, b, d, key_a, key_b)
+    return top.result()
+
+
+_GROW_STEPS = 6  # radius doublings top_pair_arrays tries below max_dist
+
+
+def top_pair_arrays(coords, keys, max_dist, max_pairs, scale_length=1.0, adjacency=()):
+    """top_pairs with NumPy array operations only, for the background worker.
+
+    The Python loops of KDTree and TopPairs hold the GIL the whole time;
+    here the radius search starts at max_dist / 2**_GROW_STEPS and doubles
+    until it finds max_pairs pairs, so dense inputs never list every pair
+    within max_dist. Adjacency candidates are merged in, duplicate pair keys
+    dropped, and the shortest max_pairs picked with argpartition. Same result
+    as top_pairs: [(a, b, dist, pair_key(a, b)), ...] by ascending distance.
+    """
+    pts = np.asarray(coords, dtype=np.float64)
+    keys = np.asarray(keys, dtype=np.int64)
+    limit = max_dist * scale_length
+
+    radius = limit / 2 ** _GROW_STEPS
+    while True:
+        i, j, d = radius_pair_arrays(pts, radius)
+        if len(d) >= max_pairs or radius >= limit:
+            break
+        radius = min(radius * 2.0, limit)
+
+    a, b, dist, key_a, key_b = [pts[i]], [pts[j]], [d / scale_length], [keys[i]], [keys[j]]
+    for cand_a, cand_b, cand_dist, cand_key_a, cand_key_b in adjacency:
+        a.append(np.asarray(cand_a, dtype=np.float64).reshape(-1, 3))
+        b.append(np.asarray(cand_b, dtype=np.float64).reshape(-1, 3))
+        dist.append(cand_dist)
+        key_a.append(cand_key_a)
+        key_b.append(cand_key_b)
+    a, b, dist = np.concatenate(a), np.concatenate(b), np.concatenate(dist)
+    key_a, key_b = np.concatenate(key_a).astype(np.int64), np.concatenate(key_b).astype(np.int64)
+
+    # Orient like TopPairs: a is the endpoint in the high half of the pair key
+    flip = key_a > key_b
+    a[flip], b[flip] = b[flip], a[flip]
+    key_a, key_b = np.where(flip, key_b, key_a), np.where(flip, key_a, key_b)
+
+    order = np.lexsort((dist, key_b, key_a))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (key_a[order][1:] != key_a[order][:-1]) | (key_b[order][1:] != key_b[order][:-1])
+    keep = order[first]
+    if len(keep) > max_pairs:
+        keep = keep[np.argpartition(dist[keep], max_pairs - 1)[:max_pairs]]
+    keep = keep[np.argsort(dist[keep], kind='stable')]
+    return [(a[k], b[k], float(dist[k]), (int(key_a[k]) << 64) | int(key_b[k])) for k in keep.tolist()]
+
+
+# ========= draw buffers =========
+
+def pairs_to_line_coords(pairs):
+    """Flatten [(va, vb, dist), ...] into a (2 * n, 3) float32 LINES vertex buffer."""
+    if not pairs:
+        return np.empty((0, 3), dtype=np.float32)
+    return np.array([(va, vb) for va, vb, _dist in pairs], dtype=np.float32).reshape(-1, 3)
+
+
+# ========= all-pairs spacing statistics =========
+
+STATS_TILE = 512  # vertices per tile side; one tile of float64 diffs is ~6 MB
+STATS_BINS = 20
+
+
+def iter_tiles(n, tile=STATS_TILE):
+    """(i0, j0) origins of the upper-triangle tiles covering an n x n distance matrix."""
+    for i0 in range(0, n, tile):
+        for j0 in range(i0, n, tile):
+            yield i0, j0
+
+
+def tile_stats(coords, i0, j0, hist_max, tolerance, scale_length=1.0, tile=STATS_TILE):
+    """Spacing statistics of one distance tile, in scene units.
+
+    Only NumPy array work, which releases the GIL, so tiles can run on a
+    thread pool in parallel.
+    """
+    a = coords[i0:i0 + tile].astype(np.float64)
+    b = coords[j0:j0 + tile].astype(np.float64)
+    d = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)) / scale_length
+    if i0 == j0:
+        d = d[np.triu_indices(len(a), k=1)]  # diagonal tile: each pair once, no self pairs
+    else:
+        d = d.ravel()
+    if not len(d):
+        return None
+
+    hist, _edges = np.histogram(d, bins=STATS_BINS, range=(0.0, hist_max))
+    return {
+        "count": len(d),
+        "min": float(d.min()),
+        "max": float(d.max()),
+        "sum": float(d.sum()),
+        "under": int(np.count_nonzero(d <= tolerance)),
+        "overflow": int(np.count_nonzero(d > hist_max)),
+        "hist": hist,
+    }
+
+
+def merge_stats(acc, part):
+    """Fold one tile_stats result into the running totals (either may be None)."""
+    if part is None:
+        return acc
+    if acc is None:
+        return dict(part)
+    return {
+        "count": acc["count"] + part["count"],
+        "min": min(acc["min"], part["min"]),
+        "max": max(acc["max"], part["max"]),
+        "sum": acc["sum"] + part["sum"],
+        "under": acc["under"] + part["under"],
+        "overflow": acc["overflow"] + part["overflow"],
+        "hist": acc["hist"] + part["hist"],
+    }
@@ -0,0 +1,255 @@
+"""Headless benchmark for the World Distances measurement pipeline.
+
+Run from the repository root with Blender in background mode:
+
+    blender -b --factory-startup --python-exit-code 1 --python benchmark_measurements.py -- \
+        --sizes 1000,10000,100000,1000000 --output bench.json
+
+Each size gets a procedural grid mesh, measured in object, edit and locked
+mode. Every stage is timed over --repeat runs and written as JSON. With
+--baseline, the run exits with status 1 when a stage's median regresses by
+more than --tolerance against the stored results.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+
+import bpy
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import BlenderVertexMeasurments as wd  # noqa: E402
+
+_MODES = ("object", "edit", "locked")
+_STAGES = ("collect_vertex_pairs", "get_current_vertex_positions", "update_mesh_lines", "draw_prep")
+_NOISE_FLOOR = 0.001  # seconds; medians below this are never reported as regressions
+
+
+# ========= arguments =========
+
+def _parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="benchmark_measurements.py")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000",
+                        help="comma separated vertex counts of the generated meshes")
+    parser.add_argument("--modes", default=",".join(_MODES),
+                        help="comma separated subset of: " + ", ".join(_MODES))
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per stage")
+    parser.add_argument("--select-fraction", type=float, default=0.01,
+                        help="share of vertices selected (edit mode) or locked (locked mode)")
+    parser.add_argument("--max-mm", type=float, default=1.5, help="Max Distance setting; grid spacing is 1")
+    parser.add_argument("--max-pairs", type=int, default=500, help="Max Pairs setting")
+    parser.add_argument("--neighbor-depth", type=int, default=2, help="Adjacency Steps setting")
+    parser.add_argument("--output", default="", help="write results to this JSON file (default: stdout)")
+    parser.add_argument("--baseline", default="", help="JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed median slowdown against the baseline, as a fraction")
+    return parser.parse_args(argv)
+
+
+# ========= scene setup =========
+
+def _make_grid_object(n_verts, select_fraction, seed=0):
+    """Grid mesh of about n_verts vertices with row / column edges and a selected patch.
+
+    Vertices sit 1 unit apart with a little jitter so pair distances differ;
+    the selection is a random subset of select_fraction of them.
+    """
+    side = max(2, math.isqrt(n_verts - 1) + 1)
+    n = side * side
+    rng = np.random.default_rng(seed)
+
+    gx, gy = np.meshgrid(np.arange(side, dtype=np.float32), np.arange(side, dtype=np.float32))
+    co = np.column_stack((gx.ravel(), gy.ravel(), np.zeros(n, dtype=np.float32)))
+    co += rng.uniform(-0.2, 0.2, co.shape).astype(np.float32)
+
+    ids = np.arange(n, dtype=np.int32).reshape(side, side)
+    edges = np.concatenate((
+        np.column_stack((ids[:, :-1].ravel(), ids[:, 1:].ravel())),
+        np.column_stack((ids[:-1, :].ravel(), ids[1:, :].ravel())),
+    ))
+
+    mesh = bpy.data.meshes.new(f"WD_Bench_{n}")
+    mesh.vertices.add(n)
+    mesh.vertices.foreach_set("co", co.ravel())
+    mesh.edges.add(len(edges))
+    mesh.edges.foreach_set("vertices", edges.ravel())
+    mesh.update()
+
+    selected = np.zeros(n, dtype=bool)
+    selected[rng.choice(n, size=max(2, int(n * select_fraction)), replace=False)] = True
+    mesh.vertices.foreach_set("select", selected)
+
+    obj = bpy.data.objects.new(mesh.name, mesh)
+    bpy.context.scene.collection.objects.link(obj)
+    return obj, np.flatnonzero(selected)
+
+
+def _enter_mode(obj, mode, selected_idx):
+    """Make obj the only selected object and put it in the given benchmark mode."""
+    settings = bpy.context.scene.distance_settings
+    for other in bpy.context.view_layer.objects:
+        other.select_set(other == obj)
+    bpy.context.view_layer.objects.active = obj
+
+    if obj.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    settings.lock_selection = False
+
+    if mode == "edit":
+        bpy.ops.object.mode_set(mode='EDIT')
+    elif mode == "locked":
+        wd._store_locked_sets(settings, [(obj, selected_idx)])
+        settings.lock_selection = True
+
+
+def _remove_object(obj):
+    if obj.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    mesh = obj.data
+    bpy.data.objects.remove(obj)
+    bpy.data.meshes.remove(mesh)
+
+
+# ========= stages =========
+
+def _stage_collect(settings):
+    pairs = wd.collect_vertex_pairs(settings.max_mm, settings.max_vertices, settings.max_pairs,
+                                    settings.neighbor_depth, wd._active_locked_sets(settings))
+    wd._publish_pairs(pairs)
+
+
+def _stage_positions(_settings):
+    wd.get_current_vertex_positions()
+
+
+def _stage_mesh_lines(_settings):
+    wd.update_mesh_lines()
+
+
+_BENCH_PERSPECTIVE = np.array([
+    [1.0, 0.0, 0.0, 0.0],
+    [0.0, 1.0, 0.0, 0.0],
+    [0.0, 0.0, -1.0, -0.2],
+    [0.0, 0.0, -1.0, 10.0],
+])
+
+
+def _stage_draw_prep(_settings):
+    """Everything draw_callback_lines / draw_callback_gpu do before touching the GPU."""
+    wd._label_cache = None  # force the rebuild a new pair set would cause
+    wd.core.pairs_to_line_coords(wd._gpu_pairs)
+    mids, _texts = wd._label_data()
+    xy, in_front = wd.project_to_region(mids, _BENCH_PERSPECTIVE, 1920, 1080)
+    dist = np.array([d for _va, _vb, d in wd._gpu_pairs], dtype=np.float64)
+    wd.declutter_labels(xy[in_front], dist[in_front], 60.0, 14.0)
+
+
+_STAGE_FUNCS = dict(zip(_STAGES, (_stage_collect, _stage_positions, _stage_mesh_lines, _stage_draw_prep)))
+
+
+def _time_stage(func, settings, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(settings)
+        runs.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(runs), "min_s": min(runs), "max_s": max(runs), "runs": repeat}
+
+
+# ========= baseline comparison =========
+
+def _result_key(row):
+    return (row["mode"], row["vertices"], row["stage"])
+
+
+def _regressions(results, baseline, tolerance):
+    """Rows whose median is slower than the matching baseline row by more than tolerance."""
+    previous = {_result_key(row): row for row in baseline.get("results", [])}
+    slower = []
+    for row in results:
+        old = previous.get(_result_key(row))
+        if old is None or row["median_s"] < _NOISE_FLOOR:
+            continue
+        if row["median_s"] > old["median_s"] * (1.0 + tolerance):
+            slower.append(dict(row, baseline_median_s=old["median_s"]))
+    return slower
+
+
+# ========= main =========
+
+def main():
+    args = _parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = set(modes) - set(_MODES)
+    if unknown:
+        raise SystemExit(f"unknown modes: {', '.join(sorted(unknown))}")
+
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    wd.register()
+    settings = bpy.context.scene.distance_settings
+    settings.max_mm = args.max_mm
+    settings.max_pairs = args.max_pairs
+    settings.neighbor_depth = args.neighbor_depth
+
+    results = []
+    for n_verts in sizes:
+        obj, selected_idx = _make_grid_object(n_verts, args.select_fraction)
+        n_actual = len(obj.data.vertices)
+        settings.max_vertices = min(n_actual, settings.bl_rna.properties["max_vertices"].hard_max)
+
+        for mode in modes:
+            _enter_mode(obj, mode, selected_idx)
+            for stage in _STAGES:
+                row = {"mode": mode, "vertices": n_verts, "mesh_vertices": n_actual, "stage": stage}
+                row.update(_time_stage(_STAGE_FUNCS[stage], settings, args.repeat))
+                row["pairs"] = len(wd._gpu_pairs)
+                results.append(row)
+                print(f"{mode:>6} {n_verts:>8} {stage:<30} {row['median_s'] * 1000.0:10.2f} ms",
+                      file=sys.stderr)
+
+        _remove_object(obj)
+        wd.distance_overlay_global_clear()
+
+    report = {
+        "blender": bpy.app.version_string,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "settings": {"max_mm": args.max_mm, "max_pairs": args.max_pairs,
+                     "neighbor_depth": args.neighbor_depth, "select_fraction": args.select_fraction,
+                     "repeat": args.repeat},
+        "results": results,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            slower = _regressions(results, json.load(f), args.tolerance)
+        report["regressions"] = slower
+        for row in slower:
+            print(f"REGRESSION {row['mode']} {row['vertices']} {row['stage']}: "
+                  f"{row['baseline_median_s'] * 1000.0:.2f} ms -> {row['median_s'] * 1000.0:.2f} ms",
+                  file=sys.stderr)
+        exit_code = 1 if slower else 0
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    wd.unregister()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
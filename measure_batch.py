@@ -0,0 +1,201 @@
+"""Batch vertex spacing QA over folders of OBJ / PLY files, without Blender.
+
+Uses the same pair search as the add-on (BlenderVertexMeasurments/core.py) and spreads
+files over a process pool:
+
+    python measure_batch.py scans/ --max-dist 2.0 --tolerance 0.05 --jobs 8 --output report.jsonl
+
+One JSON line is written per file. With --strict the exit status is 1 when
+any file has a pair at or under --tolerance, or failed to load.
+"""
+
+import argparse
+import concurrent.futures
+import importlib.util
+import json
+import os
+import sys
+
+import numpy as np
+
+
+def _load_core():
+    """The add-on's core module, loaded by path: importing the package itself would need bpy."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "BlenderVertexMeasurments", "core.py")
+    spec = importlib.util.spec_from_file_location("BlenderVertexMeasurments_core", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+core = _load_core()
+
+_EXTENSIONS = (".obj", ".ply")
+
+
+# ========= mesh readers =========
+
+def read_obj_vertices(path):
+    """(n, 3) float64 vertex positions of a Wavefront OBJ file; everything but 'v' lines is ignored."""
+    rows = []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line[:2] in ("v ", "v\t"):
+                rows.append(line.split()[1:4])
+    return np.array(rows, dtype=np.float64).reshape(-1, 3)
+
+
+_PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+}
+
+
+def _read_ply_header(f):
+    """(format, [(element name, count, [(property name, type or None for lists)]), ...])."""
+    if f.readline().strip() != b"ply":
+        raise ValueError("not a PLY file")
+    fmt, elements = None, []
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError("truncated PLY header")
+        words = line.decode("ascii", errors="replace").split()
+        if not words:
+            continue
+        if words[0] == "format":
+            fmt = words[1]
+        elif words[0] == "element":
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == "property":
+            if words[1] == "list":
+                elements[-1][2].append((words[4], None))
+            else:
+                elements[-1][2].append((words[2], _PLY_TYPES[words[1]]))
+        elif words[0] == "end_header":
+            return fmt, elements
+
+
+def read_ply_vertices(path):
+    """(n, 3) float64 vertex positions of an ASCII or binary PLY file."""
+    with open(path, "rb") as f:
+        fmt, elements = _read_ply_header(f)
+        body = f.read()
+
+    skip_rows = skip_bytes = 0
+    for name, count, props in elements:
+        if name == "vertex":
+            break
+        if fmt != "ascii" and any(ptype is None for _pname, ptype in props):
+            raise ValueError(f"list properties before the vertex element are not supported ({name})")
+        skip_rows += count
+        skip_bytes += count * sum(np.dtype(ptype).itemsize for _pname, ptype in props)
+    else:
+        raise ValueError("PLY file has no vertex element")
+
+    names = [pname for pname, _ptype in props]
+    if any(ptype is None for _pname, ptype in props):
+        raise ValueError("list properties on the vertex element are not supported")
+    columns = [names.index(axis) for axis in ("x", "y", "z")]
+
+    if fmt == "ascii":
+        lines = [line for line in body.splitlines() if line.strip()][skip_rows:skip_rows + count]
+        table = np.array([line.split() for line in lines], dtype=np.float64).reshape(count, len(names))
+        return table[:, columns]
+
+    order = {"binary_little_endian": "<", "binary_big_endian": ">"}.get(fmt)
+    if order is None:
+        raise ValueError(f"unknown PLY format {fmt!r}")
+    dtype = np.dtype([(pname, order + ptype) for pname, ptype in props])
+    table = np.frombuffer(body, dtype=dtype, count=count, offset=skip_bytes)
+    return np.column_stack([table[axis].astype(np.float64) for axis in ("x", "y", "z")])
+
+
+def read_vertices(path):
+    if path.lower().endswith(".ply"):
+        return read_ply_vertices(path)
+    return read_obj_vertices(path)
+
+
+# ========= measurement =========
+
+def measure_file(path, max_dist, tolerance, top, scale):
+    """Spacing report of one mesh file, as a JSON-ready dict. Runs in a worker process."""
+    try:
+        coords = read_vertices(path) * scale
+    except (OSError, ValueError, KeyError) as exc:
+        return {"file": path, "error": str(exc)}
+
+    i, j, d = core.radius_pair_arrays(coords, max_dist)
+    nearest = np.full(len(coords), np.inf)
+    np.minimum.at(nearest, i, d)
+    np.minimum.at(nearest, j, d)
+    has_neighbour = np.isfinite(nearest)
+
+    closest = np.argsort(d)[:top] if len(d) <= top else np.argpartition(d, top)[:top]
+    closest = closest[np.argsort(d[closest])]
+
+    report = {
+        "file": path,
+        "vertices": len(coords),
+        "pairs_within": len(d),
+        "under_tolerance": int(np.count_nonzero(d <= tolerance)),
+        "min": float(d.min()) if len(d) else None,
+        "isolated": int(np.count_nonzero(~has_neighbour)),
+        "closest": [[int(i[k]), int(j[k]), float(d[k])] for k in closest.tolist()],
+    }
+    if has_neighbour.any():
+        report["nearest_median"] = float(np.median(nearest[has_neighbour]))
+        report["nearest_mean"] = float(nearest[has_neighbour].mean())
+    return report
+
+
+def _iter_mesh_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _dirs, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(_EXTENSIONS):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+# ========= main =========
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="mesh files or folders searched for .obj / .ply")
+    parser.add_argument("--max-dist", type=float, default=1.0, help="only pairs within this distance are measured")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="pairs at or under this count as violations")
+    parser.add_argument("--top", type=int, default=10, help="closest pairs listed per file")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply file coordinates by this first")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--output", default="", help="write JSON Lines here instead of stdout")
+    parser.add_argument("--strict", action="store_true",
+                        help="exit with status 1 on any tolerance violation or unreadable file")
+    args = parser.parse_args(argv)
+
+    files = list(_iter_mesh_files(args.paths))
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    failed = 0
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+            futures = [pool.submit(measure_file, path, args.max_dist, args.tolerance, args.top, args.scale)
+                       for path in files]
+            for future in futures:
+                report = future.result()
+                failed += bool(report.get("error") or report.get("under_tolerance"))
+                out.write(json.dumps(report) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"{len(files)} file(s), {failed} with errors or tolerance violations", file=sys.stderr)
+    return 1 if args.strict and failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
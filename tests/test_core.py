@@ -0,0 +1,238 @@
+"""Brute-force checks of BlenderVertexMeasurments/core.py; runs without Blender.
+
+    python -m pytest tests
+"""
+
+import collections
+import importlib.util
+import os
+
+import numpy as np
+import pytest
+
+
+def _load_core():
+    """The add-on's core module, loaded by path: importing the package itself would need bpy."""
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        "BlenderVertexMeasurments", "core.py")
+    spec = importlib.util.spec_from_file_location("BlenderVertexMeasurments_core", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+core = _load_core()
+
+SEEDS = range(8)
+
+
+@pytest.fixture(params=["kdtree", "grid"])
+def search(request, monkeypatch):
+    """Run a test once on scipy's cKDTree (when installed) and once on the NumPy grid hash."""
+    if request.param == "kdtree" and core.cKDTree is None:
+        pytest.skip("scipy is not installed")
+    if request.param == "grid":
+        monkeypatch.setattr(core, "cKDTree", None)
+    return request.param
+
+
+def _points(rng, n, spread=4.0):
+    return (rng.random((n, 3)) * spread).astype(np.float32)
+
+
+def _brute_pairs(a, b, radius):
+    d = np.linalg.norm(a[:, None, :].astype(np.float64) - b[None, :, :], axis=2)
+    return d, set(zip(*map(np.ndarray.tolist, np.nonzero(d <= radius))))
+
+
+# ========= radius search =========
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_radius_pair_arrays_matches_brute_force(search, seed):
+    rng = np.random.default_rng(seed)
+    pts = _points(rng, int(rng.integers(2, 300)))
+    radius = float(rng.uniform(0.05, 1.0))
+
+    i, j, d = core.radius_pair_arrays(pts, radius)
+    dist, within = _brute_pairs(pts, pts, radius)
+    expected = {(p, q) for p, q in within if p < q}
+
+    assert (i < j).all()
+    assert set(zip(i.tolist(), j.tolist())) == expected
+    np.testing.assert_allclose(d, dist[i, j], rtol=1e-6)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_cross_radius_pair_arrays_matches_brute_force(search, seed):
+    rng = np.random.default_rng(seed)
+    a = _points(rng, int(rng.integers(1, 200)))
+    b = _points(rng, int(rng.integers(1, 200))) + np.float32(rng.uniform(0.0, 2.0))
+    radius = float(rng.uniform(0.05, 1.0))
+
+    i, j, d = core.cross_radius_pair_arrays(a, b, radius)
+    dist, expected = _brute_pairs(a, b, radius)
+
+    assert set(zip(i.tolist(), j.tolist())) == expected
+    np.testing.assert_allclose(d, dist[i, j], rtol=1e-6)
+
+
+def test_radius_search_handles_degenerate_input(search):
+    empty = np.empty((0, 3), dtype=np.float32)
+    assert len(core.radius_pair_arrays(empty, 1.0)[0]) == 0
+    assert len(core.cross_radius_pair_arrays(empty, np.zeros((3, 3)), 1.0)[0]) == 0
+    assert len(core.radius_pair_arrays(np.zeros((5, 3)), 0.0)[0]) == 0
+    i, j, d = core.radius_pair_arrays(np.zeros((4, 3)), 0.5)  # coincident points
+    assert len(d) == 6 and not d.any()
+
+
+# ========= top-k selection =========
+
+def _adjacency(rng, pts, keys, max_dist, scale_length):
+    """Random candidate pairs shaped like core.adjacency_candidates output."""
+    ia = rng.integers(0, len(pts), 40)
+    ib = rng.integers(0, len(pts), 40)
+    ia, ib = ia[ia != ib], ib[ia != ib]
+    dist = np.linalg.norm(pts[ia].astype(np.float64) - pts[ib], axis=1) / scale_length
+    order = np.argsort(dist)
+    order = order[dist[order] <= max_dist]
+    return pts[ia[order]], pts[ib[order]], dist[order], keys[ia[order]], keys[ib[order]]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_top_pair_arrays_matches_top_pairs(search, seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(4, 300))
+    scale_length = float(rng.choice([1.0, 0.01]))
+    pts = _points(rng, n) * np.float32(scale_length)
+    keys = np.concatenate((core.vertex_keys(0, np.arange(n // 2)), core.vertex_keys(1, np.arange(n - n // 2))))
+    max_dist = float(rng.uniform(0.1, 2.0))
+    max_pairs = int(rng.integers(1, 60))
+    adjacency = [_adjacency(rng, pts, keys, max_dist, scale_length)]
+
+    expected = core.top_pairs(pts, keys, max_dist, max_pairs, scale_length, adjacency)
+    got = core.top_pair_arrays(pts, keys, max_dist, max_pairs, scale_length, adjacency)
+
+    assert len(got) == len(expected)
+    np.testing.assert_allclose([p[2] for p in got], [p[2] for p in expected], rtol=1e-6)
+    assert len({p[3] for p in got}) == len(got)
+    by_key = dict(zip(keys.tolist(), pts.tolist()))
+    for a, b, _dist, key in got:
+        (slot_a, idx_a), (slot_b, idx_b) = core.split_pair_key(key)
+        np.testing.assert_allclose(a, by_key[int(core.vertex_keys(slot_a, idx_a))], rtol=1e-6)
+        np.testing.assert_allclose(b, by_key[int(core.vertex_keys(slot_b, idx_b))], rtol=1e-6)
+
+
+def test_top_pairs_dedupes_adjacency_against_global_pairs():
+    pts = np.array([[0, 0, 0], [0.5, 0, 0], [3, 0, 0]], dtype=np.float32)
+    keys = core.vertex_keys(0, np.arange(3))
+    duplicate = (pts[[1]], pts[[0]], np.array([0.5]), keys[[1]], keys[[0]])
+
+    for select in (core.top_pairs, core.top_pair_arrays):
+        pairs = select(pts, keys, 1.0, 10, 1.0, [duplicate])
+        assert [p[3] for p in pairs] == [core.pair_key(keys[0], keys[1])]
+
+
+# ========= adjacency graph =========
+
+def _python_bfs(edges, n, source, depth):
+    neighbours = collections.defaultdict(set)
+    for u, v in edges:
+        neighbours[u].add(v)
+        neighbours[v].add(u)
+    seen, frontier = {source}, {source}
+    for _step in range(depth):
+        frontier = {w for v in frontier for w in neighbours[v]} - seen
+        seen |= frontier
+    return seen - {source}
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_expand_neighbourhoods_matches_python_bfs(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(2, 60))
+    edges = rng.integers(0, n, (int(rng.integers(1, 3 * n)), 2))
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    sources = rng.choice(n, size=int(rng.integers(1, n + 1)), replace=False)
+    depth = int(rng.integers(1, 4))
+
+    indptr, indices = core.build_csr(n, edges.astype(np.int64))
+    owner, reached = core.expand_neighbourhoods(indptr, indices, sources, depth)
+
+    got = collections.defaultdict(set)
+    for o, v in zip(owner.tolist(), reached.tolist()):
+        assert v not in got[o]  # each (source, vertex) reported once
+        got[o].add(v)
+    for k, source in enumerate(sources.tolist()):
+        assert got[k] == _python_bfs(edges.tolist(), n, source, depth)
+
+
+# ========= representative sampling =========
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_voxel_sample_stays_within_budget(seed):
+    rng = np.random.default_rng(seed)
+    pts = _points(rng, int(rng.integers(1, 3000)))
+    budget = int(rng.integers(1, 500))
+
+    picked = core.voxel_sample(pts, budget)
+
+    assert len(picked) <= budget
+    assert len(np.unique(picked)) == len(picked)
+    assert (np.diff(picked) > 0).all()
+    assert picked.min() >= 0 and picked.max() < len(pts)
+
+
+def test_voxel_sample_covers_the_shape():
+    # A dense cluster must not take the whole budget from the sparse rest
+    rng = np.random.default_rng(0)
+    pts = np.concatenate((rng.random((5000, 3)) * 0.01, rng.random((200, 3)) * 10.0))
+    picked = core.voxel_sample(pts, 100)
+    assert np.count_nonzero(picked >= 5000) > 50
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_split_budget_shares(seed):
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(0, 1000, int(rng.integers(1, 6)))
+    weights = rng.random(len(counts)) * (rng.random(len(counts)) > 0.2)
+    budget = int(rng.integers(0, 3000))
+
+    shares = core.split_budget(counts, weights, budget)
+
+    assert (shares >= 0).all() and (shares <= counts).all()
+    assert shares.sum() == min(budget, counts.sum())
+
+
+def test_split_budget_is_proportional_until_capped():
+    np.testing.assert_array_equal(core.split_budget([1000, 1000], [3.0, 1.0], 400), [300, 100])
+    np.testing.assert_array_equal(core.split_budget([1000000, 2000], [1.0, 1.0], 10000), [8000, 2000])
+
+
+# ========= draw buffers =========
+
+def test_pairs_to_line_coords():
+    pairs = [((0.0, 1.0, 2.0), (3.0, 4.0, 5.0), 1.0), ((6.0, 7.0, 8.0), (9.0, 10.0, 11.0), 2.0)]
+    coords = core.pairs_to_line_coords(pairs)
+    assert coords.dtype == np.float32
+    np.testing.assert_array_equal(coords, np.arange(12, dtype=np.float32).reshape(4, 3))
+    assert core.pairs_to_line_coords([]).shape == (0, 3)
+
+
+# ========= all-pairs spacing statistics =========
+
+def test_tiled_stats_match_brute_force():
+    rng = np.random.default_rng(0)
+    pts = _points(rng, 130)
+    tile, hist_max, tolerance = 32, 5.0, 0.3
+
+    acc = None
+    for i0, j0 in core.iter_tiles(len(pts), tile):
+        acc = core.merge_stats(acc, core.tile_stats(pts, i0, j0, hist_max, tolerance, tile=tile))
+
+    dist, _within = _brute_pairs(pts, pts, 0.0)
+    d = dist[np.triu_indices(len(pts), k=1)]
+    assert acc["count"] == len(d)
+    assert acc["under"] == np.count_nonzero(d <= tolerance)
+    assert acc["overflow"] == np.count_nonzero(d > hist_max)
+    np.testing.assert_allclose((acc["min"], acc["max"], acc["sum"]), (d.min(), d.max(), d.sum()), rtol=1e-6)
+    np.testing.assert_array_equal(acc["hist"], np.histogram(d, bins=core.STATS_BINS, range=(0.0, hist_max))[0])